@@ -0,0 +1,43 @@
+import argparse
+import time
+import numpy as np
+
+from env.network_env import make_telemetry_env
+
+#env stepping throughput of N TelemetryEnv in a DummyVectorEnv and of one
+#BatchedTelemetryEnv, driven by a uniformly random feasible action per episode
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--env-nums', type=int, nargs='+', default=[8, 64, 256])
+    parser.add_argument('--steps', type=int, default=20000)
+    return parser.parse_known_args()[0]
+
+def stack_mask(obs):            #vector envs return arrays of per-env dicts, the batched env stacked arrays
+    return obs["mask"] if isinstance(obs, dict) else np.stack([o["mask"] for o in obs])
+
+def bench(envs, steps, rng):
+    N = len(envs)
+    obs, _ = envs.reset()
+    mask = stack_mask(obs)
+    n = 0
+    t = time.perf_counter()
+    while n < steps:
+        act = (rng.random(mask.shape) * mask).argmax(1)     #random feasible action
+        obs, _, done, _ = envs.step(act)
+        mask = stack_mask(obs)
+        if done.any():
+            ids = np.flatnonzero(done)
+            obs, _ = envs.reset(ids)
+            mask[ids] = stack_mask(obs)
+        n += N
+    return n / (time.perf_counter() - t)
+
+if __name__ == "__main__":
+    args = get_args()
+    for N in args.env_nums:
+        _, dummy, _ = make_telemetry_env(N, 0, backend="dummy")
+        _, batched, _ = make_telemetry_env(N, 0, backend="batched")
+        old = bench(dummy, args.steps, np.random.default_rng(0))
+        new = bench(batched, args.steps, np.random.default_rng(0))
+        print("N=%-4d DummyVectorEnv %8.0f step/s  BatchedTelemetryEnv %8.0f step/s  x%.1f" % (N, old, new, new/old))
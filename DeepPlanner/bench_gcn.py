@@ -0,0 +1,68 @@
+import argparse
+import time
+import torch
+import torch.nn as nn
+
+from env.network_env import TelemetryEnv
+from env.gcnac import GCNCategoricalActor, GCNCritic, GCN
+
+#GCNConv message passing vs the cached dense adjacency of StaticGCNConv: forward and
+#backward of the GCN layer alone and of the actor + critic pass of one PPO minibatch
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--topologies', type=str, nargs='+', default=['topo/Nsfnet.graphml', 'topo/Agis.graphml', 'topo/Palmetto.graphml'])
+    parser.add_argument('-b', '--batch-size', type=int, default=512)
+    parser.add_argument('--hidden', type=int, default=64)
+    parser.add_argument('--iters', type=int, default=50)
+    return parser.parse_known_args()[0]
+
+def build(env, args, static):
+    node_num, feature_num = env.observation_space["feat"].shape
+    gcn = GCN(feature_num, 1, static=static)
+    actor = GCNCategoricalActor(1, node_num, gcn, (args.hidden, args.hidden), env.action_space.n, nn.ReLU)
+    critic = GCNCritic(1, node_num, gcn, (args.hidden, args.hidden), nn.ReLU)
+    return actor, critic
+
+def run(actor, critic, obs, edge_index):
+    actor.zero_grad()
+    critic.zero_grad()
+    logits = actor.get_logits(obs, edge_index)
+    value = critic(obs, edge_index)
+    (logits.logsumexp(-1).mean() + value.mean()).backward()
+    return logits, value
+
+def run_gcn(gcn, obs, edge_index):
+    gcn.zero_grad()
+    gcn(obs, edge_index).sum().backward()
+
+def bench(fn, *args, iters = 50):
+    fn(*args)       #warm up, builds the static adjacency
+    t = time.perf_counter()
+    for _ in range(iters):
+        fn(*args)
+    return (time.perf_counter() - t) / iters
+
+if __name__ == "__main__":
+    args = get_args()
+    torch.manual_seed(0)
+    for g in args.topologies:
+        env = TelemetryEnv(g)
+        obs = torch.rand((args.batch_size,) + env.observation_space["feat"].shape) * 4
+        mp_actor, mp_critic = build(env, args, static=False)
+        st_actor, st_critic = build(env, args, static=True)
+        st_actor.load_state_dict(mp_actor.state_dict())
+        st_critic.load_state_dict(mp_critic.state_dict())
+
+        l1, v1 = run(mp_actor, mp_critic, obs, env.edge_index)
+        l2, v2 = run(st_actor, st_critic, obs, env.edge_index)
+        diff = max((l1 - l2).abs().max().item(), (v1 - v2).abs().max().item(),
+                   (mp_actor.GCN.conv1.lin.weight.grad - st_actor.GCN.conv1.lin.weight.grad).abs().max().item())
+
+        g_mp = bench(run_gcn, mp_actor.GCN, obs, env.edge_index, iters=args.iters)
+        g_st = bench(run_gcn, st_actor.GCN, obs, env.edge_index, iters=args.iters)
+        t_mp = bench(run, mp_actor, mp_critic, obs, env.edge_index, iters=args.iters)
+        t_st = bench(run, st_actor, st_critic, obs, env.edge_index, iters=args.iters)
+        print("%-28s V=%-3d max diff %.1e" % (g, env.nodes_num, diff))
+        print("    GCN layer       GCNConv %6.2fms  static %6.2fms  x%.1f" % (g_mp*1e3, g_st*1e3, g_mp/g_st))
+        print("    actor + critic  GCNConv %6.2fms  static %6.2fms  x%.1f" % (t_mp*1e3, t_st*1e3, t_mp/t_st))
@@ -0,0 +1,48 @@
+import argparse
+import time
+import torch
+import torch.nn as nn
+
+from env.network_env import make_telemetry_env
+from env.path_collector import path_Collector
+from env.replay_buffer import TelemetryVectorReplayBuffer
+from env.rollout import RolloutCollector
+from env.gcnac import GCNActorCritic, GCNCategoricalActor, GCNCritic, GCN
+from telemetry_ppo.telemetry_policy_ppo import TelemetryPPO
+
+#collection throughput of the tianshou-style path_Collector and the preallocated
+#RolloutCollector with the same PPO policy, per env backend
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backends', type=str, nargs='+', default=['dummy', 'batched'])
+    parser.add_argument('--training-num', type=int, default=8)
+    parser.add_argument('--steps', type=int, default=4000)
+    parser.add_argument('--hidden', type=int, default=64)
+    return parser.parse_known_args()[0]
+
+def build(env, args):
+    node_num, feature_num = env.observation_space["feat"].shape
+    gcn = GCN(feature_num, 1)
+    actor = GCNCategoricalActor(1, node_num, gcn, (args.hidden, args.hidden), env.action_space.n, nn.ReLU)
+    critic = GCNCritic(1, node_num, gcn, (args.hidden, args.hidden), nn.ReLU)
+    optim = torch.optim.AdamW(GCNActorCritic(actor, critic).parameters())     #the shared GCN once
+    return TelemetryPPO(actor=actor, critic=critic, optim=optim, env=env, device="cpu",
+                        dist_fn=torch.distributions.Categorical, action_space=env.action_space, action_scaling=False)
+
+def bench(collector, steps):
+    collector.collect(n_step=steps // 10)        #warm up
+    t = time.perf_counter()
+    result = collector.collect(n_step=steps)
+    return result["n/st"] / (time.perf_counter() - t)
+
+if __name__ == "__main__":
+    args = get_args()
+    torch.manual_seed(0)
+    for backend in args.backends:
+        env, train_envs, _ = make_telemetry_env(args.training_num, 0, backend=backend)
+        policy = build(env, args)
+        buffer = TelemetryVectorReplayBuffer(args.steps*2, len(train_envs))
+        old = bench(path_Collector(policy, train_envs, buffer), args.steps)
+        new = bench(RolloutCollector(policy, train_envs), args.steps)
+        print("%-8s N=%-3d path_Collector %8.0f step/s  RolloutCollector %8.0f step/s  x%.1f" % (backend, args.training_num, old, new, new/old))
@@ -16,27 +16,11 @@ probe =[[17, 19, 20, 23, 22, 1, 2, 15, 16, 14, 13, 28, 29, 25, 24, 21], [7, 26,
 probe_dp = env.handle_probe(probe)              #probe paths input to the data plane
 print(probe_dp)
 
-print("dfs------------------------------------")
-probe_euler0a = get_dfs_path(G)
-probe_euler0 = env.handle_sw(probe_euler0a)    #convert the probe paths composed of switch nodes into those composed of ports
-probe_euler_dp0 = env.handle_probe(probe_euler0)  
-print(probe_euler_dp0)
+#baselines give switch-node paths, converted to ports and to data plane input in one call
+baselines = [("dfs", get_dfs_path), ("eulerun", get_eulerun_path), ("euler", get_euler_path), ("intbalance", get_intbalance_path)]
+sw_plans = [get_path(G) for _, get_path in baselines]
+dp_plans = env.handle_sw_batch(sw_plans, dp = True)
 
-print("eulerun--------------------------------")
-probe_eulera =get_eulerun_path(G)
-probe_euler = env.handle_sw(probe_eulera)    
-probe_euler_dp = env.handle_probe(probe_euler)  
-print(probe_euler_dp)
-
-
-print("euler----------------------------------")
-probe_euler1a = get_euler_path(G)
-probe_euler1 = env.handle_sw(probe_euler1a)    
-probe_euler_dp1 = env.handle_probe(probe_euler1)  
-print(probe_euler_dp1)
-
-print("intbalance-----------------------------")
-probe_euler2a = get_intbalance_path(G)
-probe_euler2 = env.handle_sw(probe_euler2a)   
-probe_euler_dp2 = env.handle_probe(probe_euler2)  
-print(probe_euler_dp2)
+for (name, _), probe_euler_dp in zip(baselines, dp_plans):
+    print(name.ljust(39, "-"))
+    print(probe_euler_dp)
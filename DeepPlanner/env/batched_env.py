@@ -0,0 +1,228 @@
+import numpy as np
+
+from env.network_env import TelemetryEnv
+from env.scenario import scenario_port_req
+
+class BatchedTelemetryEnv:
+    """N TelemetryEnv episodes on one topology stepped together in stacked arrays, a drop-in vector env."""
+
+    def __init__(self, env_num, g = "topo/Nsfnet.graphml", scenarios = None, sample_scenarios = False):
+        self.env = TelemetryEnv(g)          #template env holding the topology
+        self.env_num = env_num
+        self.is_async = False
+        self.is_closed = False
+        self.graphml_file = self.env.graphml_file
+        self.edge_index = self.env.edge_index
+
+        self.nodes_num = self.env.nodes_num
+        self.edge_len = self.env.edge_len
+        self.port_num = self.edge_len*2
+        self.act_num = self.port_num+1
+        self.telemetry_type = self.env.telemetry_type
+        self._steps_per_episode = self.env._steps_per_episode
+
+        self.edge_node = np.asarray(self.env.edge_index_0, dtype=np.int64)    #(E, 2)
+        self.port_edge = self.env.port_edge_index
+        self.port_peer = self.env.port_peer
+        self.port_node = self.env.port_node
+        self.node_port_mask = self.port_node[None, :] == np.arange(self.nodes_num)[:, None]
+
+        self.req_vec = self.env.req_vec                                       #requirement mask -> items
+        self.req_cost = self.env.req_cost                                     #requirement mask -> bytes
+        self.mtu_limit = self.env.mtu_limit - self.env.fixed                  #compared with occupancy without header
+        self.req_bits = np.zeros((env_num, self.edge_len), dtype=np.int64)   #(N, E) requirement masks
+        self.edge_cost = np.zeros((env_num, self.edge_len))                  #(N, E) bytes per port
+        self.nodes_feature = np.zeros((env_num, self.nodes_num, self.telemetry_type))
+
+        #per-episode requirements, drawn as independent TelemetryEnv instances would, or
+        #loaded from an (S, E) scenario bank on every reset(): row i cycles through
+        #scenarios[i::N] like the i-th test env of make_telemetry_env, or samples
+        #them if sample_scenarios
+        self.scenarios = scenarios
+        self.sample_scenarios = sample_scenarios
+        self._scenario_rng = np.random.default_rng()
+        self.restart_scenarios()
+        if scenarios is None:
+            for i in range(env_num):
+                if i > 0:
+                    self.env.get_port_req()
+                self.req_bits[i] = self.env.req_bits
+            self.set_req_bits(np.arange(env_num), self.req_bits)
+        else:                   #row i holds scenario i % S, as TelemetryEnv holds its first one
+            self.set_req_bits(np.arange(env_num), scenarios[np.arange(env_num) % len(scenarios)])
+
+        #stacked episode state
+        self._feat = self.nodes_feature.copy()                                #(N, V, T)
+        self._remain_port = np.ones((env_num, self.port_num), dtype=bool)     #unvisited ports
+        self._mask = np.ones((env_num, self.act_num), dtype=bool)
+        self._occupancy = np.zeros(env_num)                                   #bytes of the open probe
+        self._num_steps = np.zeros(env_num, dtype=np.int64)
+        self._terminated = np.zeros(env_num, dtype=bool)
+        self._probe_num = np.ones(env_num, dtype=np.int64)
+        self._probe_len = np.zeros(env_num, dtype=np.int64)                  #length of the open probe
+        self._len_mean = np.zeros(env_num)                                   #running mean and M2 of probe lengths (Welford)
+        self._len_m2 = np.zeros(env_num)
+        self._actions = np.zeros((env_num, self._steps_per_episode), dtype=np.int64)
+        self.restart()          #the scenario bank is left for the first reset()
+
+    def __len__(self):
+        return self.env_num
+
+    @property
+    def action_space(self):
+        return [self.env.action_space for _ in range(self.env_num)]
+
+    @property
+    def observation_space(self):
+        return [self.env.observation_space for _ in range(self.env_num)]
+
+    def _wrap_id(self, id = None):
+        if id is None:
+            return np.arange(self.env_num)
+        return np.atleast_1d(np.asarray(id, dtype=np.int64))
+
+    #observations are gathered with fancy indexing, so every reset()/step() hands out a
+    #fresh copy that callers may keep
+    def _obs(self, id):
+        return {"feat": self._feat[id], "mask": self._mask[id]}
+
+    def _info(self, id):        #the step limit ends episodes as terminated, nothing is ever truncated
+        return {'num_steps': self._num_steps[id], 'TimeLimit.truncated': np.zeros(len(id), dtype=bool)}
+
+    def set_req_bits(self, id, req_bits):       #(n, E) requirement masks of episodes id
+        self.req_bits[id] = req_bits
+        self.edge_cost[id] = self.req_cost[req_bits]
+        edge_req = self.req_vec[req_bits]
+        feat = np.zeros((len(id), self.nodes_num, self.telemetry_type))
+        rows = np.arange(len(id))[:, None]
+        np.add.at(feat, (rows, self.edge_node[None, :, 0]), edge_req)
+        np.add.at(feat, (rows, self.edge_node[None, :, 1]), edge_req)
+        self.nodes_feature[id] = feat
+
+    def restart_scenarios(self):        #the next reset() loads scenario i % S into row i
+        self._scenario = np.arange(self.env_num) - self.env_num
+        if self.scenarios is not None:
+            self._scenario = np.arange(self.env_num) % len(self.scenarios) - self.env_num
+
+    def next_scenario(self, id):
+        if self.sample_scenarios:
+            self._scenario[id] = self._scenario_rng.integers(len(self.scenarios), size=len(id))
+        else:
+            self._scenario[id] += self.env_num
+            wrap = id[self._scenario[id] >= len(self.scenarios)]
+            self._scenario[wrap] = wrap % len(self.scenarios)
+        self.set_req_bits(id, self.scenarios[self._scenario[id]])
+
+    def reset(self, id = None, **kwargs):
+        id = self._wrap_id(id)
+        if self.scenarios is not None:
+            self.next_scenario(id)
+        return self.restart(id)
+
+    def restart(self, id = None):       #new episodes on the requirements the rows hold, the scenario bank is not advanced
+        id = self._wrap_id(id)
+        self._feat[id] = self.nodes_feature[id]
+        self._remain_port[id] = True
+        self._mask[id] = True
+        self._mask[id, 0] = False
+        self._occupancy[id] = 0
+        self._num_steps[id] = 0
+        self._terminated[id] = False
+        self._probe_num[id] = 1
+        self._probe_len[id] = 0
+        self._len_mean[id] = 0
+        self._len_m2[id] = 0
+        self._actions[id] = 0
+
+        return self._obs(id), self._info(id)
+
+    def step(self, action, id = None):
+        id = self._wrap_id(id)
+        action = np.asarray(action, dtype=np.int64).reshape(-1)
+        assert len(action) == len(id)
+        assert not self._terminated[id].any(), "One episodic has terminated"
+        self._actions[id, self._num_steps[id]] = action
+        reward = np.zeros(len(id))
+
+        new = action == 0
+        if new.any():                       #create a new probe
+            r = id[new]
+            self._probe_num[r] += 1
+            self._probe_len[r] = 0
+            self._occupancy[r] = 0
+            delta = -self._len_mean[r]                                      #a new empty probe is one more sample
+            self._len_mean[r] += delta / self._probe_num[r]
+            self._len_m2[r] += delta * -self._len_mean[r]
+            self._mask[r, 1:] = self._remain_port[r]
+            self._mask[r, 0] = False        #prevent consecutive creation of new probes
+
+        if not new.all():                   #extend the open probe through a port
+            sel = ~new
+            r = id[sel]
+            p = action[sel]-1
+            e = self.port_edge[p]
+            x_1 = self.port_peer[p]
+            req = self.req_vec[self.req_bits[r, e]]
+            self._feat[r, self.edge_node[e, 0]] -= req
+            self._feat[r, self.edge_node[e, 1]] -= req
+            self._remain_port[r, p] = False
+            self._remain_port[r, x_1] = False
+
+            cost = self.edge_cost[r, e]
+            self._occupancy[r] += 2*cost
+            l = self._probe_len[r]                                              #the open probe gets 2 more ports
+            old_mean = self._len_mean[r]
+            self._len_mean[r] += 2 / self._probe_num[r]
+            self._len_m2[r] += 2 * (2*l + 2 - old_mean - self._len_mean[r])
+            self._probe_len[r] = l+2
+            reward[sel] = -(self._occupancy[r]-cost) * self.env.norm_param     #last port adds no overhead yet
+
+            over = self._occupancy[r] > self.mtu_limit                       #MTU constraint
+            self._mask[r, 1:] = self.node_port_mask[self.port_node[x_1]] & self._remain_port[r]
+            self._mask[r[over], 1:] = False
+            self._mask[r, 0] = True
+
+        self._num_steps[id] += 1
+        done = (self._num_steps[id] >= self._steps_per_episode) | ~self._feat[id].any(axis=(1, 2))
+        self._terminated[id] = done
+        if done.any():
+            reward[done] += self.clc_final_rwd(id[done])
+
+        return self._obs(id), reward, done, self._info(id)
+
+    def clc_final_rwd(self, id):
+        k = self._probe_num[id]
+        probe_var = self._len_m2[id]/k                                       #population variance of probe lengths
+        env = self.env
+        return -(env.alpha*probe_var + env.beta*k) * env.norm_param_final + env.bal_param
+
+    def get_probe(self, i):             #probe paths of episode i in TelemetryEnv._laststate["probe"] form
+        probe = [[]]
+        for a in self._actions[i, :self._num_steps[i]]:
+            if a == 0:
+                probe.append([])
+            else:
+                probe[-1] += [int(a-1), int(self.port_peer[a-1])]
+        return probe
+
+    def get_env_attr(self, key, id = None):
+        id = self._wrap_id(id)
+        if key == "_laststate":
+            return [dict(nodes_feature = self.nodes_feature[i], probe = self.get_probe(i)) for i in id]
+        if key == "port_req":
+            return [scenario_port_req(self.req_bits[i], self.telemetry_type) for i in id]
+        if key == "req_bits":
+            return [self.req_bits[i].copy() for i in id]
+        return [getattr(self.env, key) for _ in id]
+
+    def seed(self, seed = None):
+        self.env.seed(seed)
+        self._scenario_rng = np.random.default_rng(seed)
+        self.restart_scenarios()
+        return [seed]*self.env_num
+
+    def render(self, **kwargs):
+        return [None]*self.env_num
+
+    def close(self):
+        self.is_closed = True
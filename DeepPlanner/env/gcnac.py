@@ -0,0 +1,224 @@
+import torch
+import torch.nn as nn
+from collections import OrderedDict
+import numpy as np
+from torch.distributions.categorical import Categorical
+from torch_geometric.nn import GCNConv
+from torch_geometric.nn.conv.gcn_conv import gcn_norm
+from tianshou.utils.net.common import ActorCritic
+
+#GCN actor and critic models shared by the ppo, a2c and pg policy packages
+
+def mlp(sizes, activation, dropout_flag=False, dropout=0.5, output_activation=nn.Identity):
+    layers = []
+    for j in range(len(sizes)-1):
+        act = activation if j < len(sizes)-2 else output_activation
+        if dropout_flag:
+            layers += [nn.Linear(sizes[j], sizes[j+1]), act(), nn.Dropout(dropout)]
+        else:
+            layers += [nn.Linear(sizes[j], sizes[j+1]), act()]
+    return nn.Sequential(*layers)
+
+class StaticGCNConv(GCNConv):
+    """GCNConv with a cached dense normalized adjacency for graphs that never change."""
+
+    cache_size = 8          #one per topology of a multi-topology model is plenty
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._adj = OrderedDict()       #id(edge_index) -> (edge_index, dense adjacency), least recently used first
+
+    def dense_adj(self, edge_index, num_nodes, dtype):
+        key = id(edge_index)
+        hit = self._adj.get(key)
+        if hit is None or hit[0] is not edge_index or hit[1].shape[0] != num_nodes or hit[1].dtype != dtype:
+            index, weight = gcn_norm(edge_index, None, num_nodes, self.improved, self.add_self_loops, self.flow, dtype)
+            src, dst = (index[0], index[1]) if self.flow == "source_to_target" else (index[1], index[0])
+            adj = torch.zeros(num_nodes, num_nodes, dtype=dtype, device=edge_index.device)
+            adj.index_put_((dst, src), weight, accumulate=True)       #out[dst] += weight * x[src]
+            hit = (edge_index, adj)     #keeps edge_index alive, so its id is not reused while cached
+            self._adj[key] = hit
+        self._adj.move_to_end(key)
+        if len(self._adj) > self.cache_size:
+            self._adj.popitem(last=False)
+        return hit[1]
+
+    def forward(self, x, edge_index):
+        out = self.dense_adj(edge_index, x.size(-2), x.dtype) @ self.lin(x)
+        if self.bias is not None:
+            out = out + self.bias
+        return out
+
+class GCN(torch.nn.Module):
+    def __init__(self, node_features, single_emb, static = True):      #input v*node_features, output v*single_emb
+        super(GCN, self).__init__()
+        conv = StaticGCNConv if static else GCNConv     #static: cached dense adjacency
+        self.conv1 = conv(node_features, single_emb)
+        self.relu = torch.nn.ReLU()
+ 
+ 
+    def forward(self, x, edge_index):
+            
+        x = self.relu(self.conv1(x, edge_index))
+
+        if (len(x.size()) == 3):
+            state_emb = torch.flatten(x, 1)
+        else:
+            state_emb = torch.flatten(x)    #return [v*single_emb]
+ 
+        return state_emb
+    
+class Actor(nn.Module):
+
+    def _distribution(self, obs):
+        raise NotImplementedError
+
+    def _log_prob_from_distribution(self, pi, act):
+        raise NotImplementedError
+
+    def forward(self, feature_matrix, edge_index, act=None):
+        # Produce action distributions for given observations, and
+        # optionally compute the log likelihood of given actions under
+        # those distributions.
+        pi = self._distribution(feature_matrix, edge_index)
+        logp_a = None
+        if act is not None:
+            logp_a = self._log_prob_from_distribution(pi, act)
+        return pi
+    
+class GCNCategoricalActor(Actor):
+
+    def __init__(self, feature_num, node_num, gcn, hidden_sizes, act_num, activation):
+        super().__init__()
+        self.GCN = gcn
+        self.logits_net = mlp([feature_num*node_num] + list(hidden_sizes) + [act_num], activation)
+
+    # logits is the log probability, log_p = ln(p)
+    def _distribution(self, feature_matrix, edge_index):
+        obs_emb = self.GCN(feature_matrix, edge_index)
+        logits = self.logits_net(obs_emb)
+        return Categorical(logits=logits)
+
+    def get_logits(self, feature_matrix, edge_index):
+        obs_emb = self.GCN(feature_matrix, edge_index)
+        logits = self.logits_net(obs_emb)
+        return logits
+
+    def _log_prob_from_distribution(self, pi, act):
+        return pi.log_prob(act)
+    
+class GCNCritic(nn.Module):
+
+    def __init__(self, feature_num, node_num, gcn, hidden_sizes, activation):
+        super().__init__()
+        self.GCN = gcn
+        self.v_net = mlp([feature_num*node_num] + list(hidden_sizes) + [1], activation)
+
+    def forward(self, feature_matrix, edge_index):
+        return torch.squeeze(self.v_net(self.GCN(feature_matrix, edge_index)), -1)          #critical to ensure v has right shape.
+
+class GraphSet:
+    """Graph tensors of the topologies a topology-agnostic model plans on, indexed by topo id."""
+
+    def __init__(self, topos = (), device = "cpu"):
+        self.device = device
+        self.graphs = []
+        for topo in topos:
+            self.add(topo)
+
+    def add(self, topo):        #compiled topology (env.topology.load_topology) -> topo id
+        edge = torch.tensor(np.array(topo["edge_index"]).T, dtype=torch.long)
+        port_node = torch.tensor(np.array(topo["port_node"]), dtype=torch.long)
+        port_peer = torch.tensor(np.array(topo["port_peer"]), dtype=torch.long)
+        self.graphs.append(dict(
+            nodes_num=int(topo["nodes_num"]),
+            port_num=len(port_node),
+            edge_index=torch.cat([edge, edge.flip(0)], 1).to(self.device),     #messages both ways
+            port_node=port_node.to(self.device),
+            peer_node=port_node[port_peer].to(self.device),
+        ))
+        return len(self.graphs)-1
+
+    @property
+    def act_num(self):          #width of the padded logits: largest port count + {0}
+        return max(g["port_num"] for g in self.graphs) + 1
+
+    def embed(self, gcn, feature_matrix, topo):     #yield (graph, batch rows, node embeddings) per topology in the batch
+        for k in torch.unique(topo).tolist():
+            rows = torch.nonzero(topo == k).squeeze(1)
+            g = self.graphs[k]
+            yield g, rows, gcn(feature_matrix[rows, :g["nodes_num"]], g["edge_index"])
+
+class NodeGCN(torch.nn.Module):
+    def __init__(self, node_features, hidden, static = True):      #input b*v*node_features, output b*v*hidden
+        super(NodeGCN, self).__init__()
+        conv = StaticGCNConv if static else GCNConv
+        self.conv1 = conv(node_features, hidden)
+        self.conv2 = conv(hidden, hidden)
+        self.relu = torch.nn.ReLU()
+
+    def forward(self, x, edge_index):
+        x = self.relu(self.conv1(x, edge_index))
+        return self.relu(self.conv2(x, edge_index))
+
+def pool(node_emb):             #mean and max over the nodes, fixed size for any graph
+    return torch.cat([node_emb.mean(-2), node_emb.max(-2).values], -1)
+
+class GCNPortActor(nn.Module):
+    """Scores each port from the embeddings of its two nodes, so the weights fit any topology."""
+
+    def __init__(self, gcn, hidden, graphs, hidden_sizes, activation):
+        super().__init__()
+        self.GCN = gcn
+        self.graphs = graphs
+        self.port_net = mlp([2*hidden] + list(hidden_sizes) + [1], activation)
+        self.new_net = mlp([2*hidden] + list(hidden_sizes) + [1], activation)
+
+    def forward(self, feature_matrix, topo):
+        return Categorical(logits=self.get_logits(feature_matrix, topo))
+
+    def get_logits(self, feature_matrix, topo):
+        logits = feature_matrix.new_full((len(feature_matrix), self.graphs.act_num), float("-inf"))
+        for g, rows, h in self.graphs.embed(self.GCN, feature_matrix, topo):
+            logits[rows, :1+g["port_num"]] = self.head(h, g)
+        return logits
+
+    def head(self, h, g):       #(b, V, hidden) node embeddings of graph g -> (b, 1+P) logits
+        port_emb = torch.cat([h[:, g["port_node"]], h[:, g["peer_node"]]], -1)    #(b, P, 2*hidden)
+        return torch.cat([self.new_net(pool(h)), self.port_net(port_emb).squeeze(-1)], -1)
+
+class GCNPooledCritic(nn.Module):
+
+    def __init__(self, gcn, hidden, graphs, hidden_sizes, activation):
+        super().__init__()
+        self.GCN = gcn
+        self.graphs = graphs
+        self.v_net = mlp([2*hidden] + list(hidden_sizes) + [1], activation)
+
+    def forward(self, feature_matrix, topo):
+        v = feature_matrix.new_zeros(len(feature_matrix))
+        for g, rows, h in self.graphs.embed(self.GCN, feature_matrix, topo):
+            v[rows] = self.head(h)
+        return v
+
+    def head(self, h):
+        return self.v_net(pool(h)).squeeze(-1)
+
+class GCNActorCritic(ActorCritic):
+    """Actor and critic sharing one GCN, evaluated with a single pass of the trunk."""
+
+    def __init__(self, actor, critic):
+        super().__init__(actor, critic)
+        assert actor.GCN is critic.GCN, "actor and critic must share the GCN"
+
+    def forward(self, feature_matrix, graph):
+        actor, critic = self.actor, self.critic
+        if hasattr(actor, "graphs"):     #GCNPortActor, one trunk pass per topology in the batch
+            logits = feature_matrix.new_full((len(feature_matrix), actor.graphs.act_num), float("-inf"))
+            value = feature_matrix.new_zeros(len(feature_matrix))
+            for g, rows, h in actor.graphs.embed(actor.GCN, feature_matrix, graph):
+                logits[rows, :1+g["port_num"]] = actor.head(h, g)
+                value[rows] = critic.head(h)
+            return logits, value
+        obs_emb = actor.GCN(feature_matrix, graph)
+        return actor.logits_net(obs_emb), torch.squeeze(critic.v_net(obs_emb), -1)
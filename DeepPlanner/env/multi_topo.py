@@ -0,0 +1,87 @@
+import gym
+import numpy as np
+
+from env.network_env import VECTOR_ENVS, TelemetryEnv
+from env.scenario import make_scenarios
+from env.topology import load_topology
+
+class PaddedTelemetryEnv(gym.Env):
+    """TelemetryEnv with observations padded to the largest graph and tagged with its topo id."""
+
+    def __init__(self, env, topo_id, nodes_num, act_num):
+        assert not env.local_actions, "padded observations need global actions"
+        self.env = env
+        self.topo_id = topo_id
+        feat_shape = (nodes_num, env.observation_space["feat"].shape[1])
+        self._observation_space = gym.spaces.Dict({
+            "feat": gym.spaces.Box(low=0, high=np.inf, shape=feat_shape, dtype=np.float64),
+            "mask": gym.spaces.Box(low=0, high=1, shape=(act_num,), dtype=bool),
+            "topo": gym.spaces.Discrete(topo_id+1),
+        })
+        self._action_space = gym.spaces.Discrete(act_num)
+
+    @property
+    def observation_space(self):
+        return self._observation_space
+
+    @property
+    def action_space(self):
+        return self._action_space
+
+    def __getattr__(self, key):
+        if key == "env":
+            raise AttributeError(key)
+        return getattr(self.env, key)
+
+    def pad(self, obs):
+        feat = np.zeros(self._observation_space["feat"].shape)
+        feat[:len(obs["feat"])] = obs["feat"]
+        mask = np.zeros(self._action_space.n, dtype=bool)
+        mask[:len(obs["mask"])] = obs["mask"]
+        return {"feat": feat, "mask": mask, "topo": self.topo_id}
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset()
+        return self.pad(obs), info
+
+    def restart(self):
+        obs, info = self.env.restart()
+        return self.pad(obs), info
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        return self.pad(obs), reward, done, info
+
+    def set_state(self, state):
+        return self.pad(self.env.set_state(state))
+
+    def seed(self, seed = None):
+        return self.env.seed(seed)
+
+def make_multi_topology_env(graphs, training_num = 0, test_num = 0, backend = "dummy", scenario_num = 0, test_scenario_num = 0, scenario_seed = 0):
+    """Template env and train/test vector envs cycling through ``graphs``, topo ids are their positions."""
+    assert backend in VECTOR_ENVS, "the batched backend runs a single topology"
+    topos = [load_topology(g) for g in graphs]
+    nodes_num = max(int(topo["nodes_num"]) for topo in topos)
+    act_num = max(len(topo["port_node"]) for topo in topos) + 1
+
+    def make_env(k, bank = None, sample = False):
+        return lambda: PaddedTelemetryEnv(TelemetryEnv(graphs[k], scenarios=bank, sample_scenarios=sample), k, nodes_num, act_num)
+
+    env = make_env(0)()
+    env.seed(0)
+    #requirement banks per graph, used as in make_telemetry_env: training envs sample
+    #their graph's bank, test env j of a graph cycles through its share of the evaluation bank
+    def make_banks(num, seed):
+        return [make_scenarios(len(topo["edge_index"]), num, seed, env.telemetry_type) if num else None for topo in topos]
+    train_banks, test_banks = make_banks(scenario_num, scenario_seed), make_banks(test_scenario_num, scenario_seed+1)
+
+    train_envs, test_envs = None, None
+    if training_num:
+        train_envs = VECTOR_ENVS[backend]([make_env(i % len(graphs), train_banks[i % len(graphs)], True) for i in range(training_num)])
+        train_envs.seed(0)
+    if test_num:
+        test_envs = VECTOR_ENVS[backend]([make_env(k, None if bank is None else bank[j % len(bank)::test_num])
+                                          for k, bank in enumerate(test_banks) for j in range(test_num)])
+        test_envs.seed(0)
+    return env, train_envs, test_envs
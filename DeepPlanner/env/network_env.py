@@ -1,23 +1,27 @@
-from collections import Counter
-from statistics import pvariance
 import gym
 from sympy import N
 import torch
 import random
-from copy import deepcopy
 import numpy as np
 import pdb, os, time, json
 import networkx as nx
 import matplotlib.pyplot as plt
 from tianshou.data import Batch
-from tianshou.env import DummyVectorEnv
-import sys, math
+from tianshou.env import DummyVectorEnv, ShmemVectorEnv, SubprocVectorEnv
+import sys, math, atexit
+
+from env.scenario import make_scenarios, scenario_port_req
+from env.topology import SharedTopology, attach_topology, load_topology, release_topology, share_topology
 
 random.seed(1)
 class TelemetryEnv(gym.Env):
-    def __init__(self, g = "topo/Nsfnet.graphml"):
+    def __init__(self, g = "topo/Nsfnet.graphml", topo = None, scenarios = None, sample_scenarios = False, local_actions = False):
         self.graphml_file = g
-        self.G = nx.read_graphml(self.graphml_file)
+        if topo is None:                #compiled topology arrays, shared by every env on the same graph
+            topo = load_topology(self.graphml_file)
+        elif isinstance(topo, SharedTopology):
+            topo = attach_topology(topo)
+        self.topo = topo
         
         self.alpha = 0.01               #timeliness weight
         self.beta= 0.24                 #control plane overhead weight
@@ -28,42 +32,80 @@ class TelemetryEnv(gym.Env):
         self.fixed = 106                #fixed header length in bytes
         self.MTU = 1500                 #MTU in bytes
         
-        self.nodes = self.G.nodes()  
-        self.nodes_num = len(self.nodes)
+        self.nodes_num = int(topo["nodes_num"])
+        self.nodes = range(self.nodes_num)
         
-        self.edge_index_0 = [edge for edge in self.G.edges()]
-        self.edge_index_0 = [(int(u), int(v)) for u, v in self.edge_index_0]
+        self.edge_node = topo["edge_index"]        #(E, 2) end nodes of each edge
+        self.edge_index_0 = [(int(u), int(v)) for u, v in topo["edge_index"]]
         self.edge_index = torch.LongTensor(np.array(self.edge_index_0).T) 
         self.edge_len = len(self.edge_index_0)
         
         self.node_port = {} 
         self.edge_port_index = []   
-        self.get_node_port()
-        self.get_edge_port_index()
+        self.get_port_tables()      #port->node, port->peer port, port->edge and node->port slice
 
-        self.port_req = []  
-        self.nodes_feature = np.zeros((self.nodes_num, self.telemetry_type))
-        self.port_edge_index = np.zeros(self.edge_len*2)
-        self.get_port_req()         #generate data collection requirements of ports
-        self.get_nodes_feature()    #generate node feature matrix
-        self.get_port_edge()
+        #optional (S, E) requirement bank, see env.scenario; reset() loads the next
+        #scenario in order, or a random one if sample_scenarios
+        self.scenarios = scenarios
+        self.sample_scenarios = sample_scenarios
+        self._scenario = -1
+        self._scenario_rng = np.random.default_rng()
 
         self.C_m = []
         self.get_C_m()
+        self.get_req_tables()       #bytes and item counts of every requirement mask
 
-        self._observation_space = gym.Space(shape=list(self.nodes_feature.shape))
+        #requirements as one mask per edge, bit t set when its ports collect item t+1
+        self.req_bits = np.zeros(self.edge_len, dtype=np.int64)
+        self.nodes_feature = np.zeros((self.nodes_num, self.telemetry_type))
+        if scenarios is None:
+            self.get_port_req()     #generate data collection requirements of ports
+        else:
+            self.req_bits = scenarios[0].astype(np.int64)
+        self.get_nodes_feature()    #generate node feature matrix
 
-        self._action_space = gym.spaces.Discrete(self.edge_len*2+1)     #action_num = port_num + {0}
-        
-        self.mask = None
+        self.port_cost = np.zeros(self.edge_len*2, dtype=np.int64)
+        self.get_port_cost()        #bytes added to a probe by each port
+        self.mtu_limit = self.MTU - 2*sum(self.C_m)     #largest probe that may still be extended
+
+        #local action mode: action k>0 is the k-th port of the current node rather than a
+        #global port, and the feature matrix gets one more column flagging that node.
+        #A new probe starts at the node with the most unvisited ports
+        self.local_actions = local_actions
+        self.max_degree = int(np.diff(self.node_port_ptr).max())
+        self._node = 0              #current node
+        self._remain_deg = np.diff(self.node_port_ptr)      #unvisited ports per node
+        act_num = self.max_degree+1 if local_actions else self.edge_len*2+1
+        feat_shape = (self.nodes_num, self.telemetry_type+1 if local_actions else self.telemetry_type)
+
+        #observation = node feature matrix + feasible-action mask
+        self._observation_space = gym.spaces.Dict({
+            "feat": gym.spaces.Box(low=0, high=np.inf, shape=feat_shape, dtype=np.float64),
+            "mask": gym.spaces.Box(low=0, high=1, shape=(act_num,), dtype=bool),
+        })
+
+        self._action_space = gym.spaces.Discrete(act_num)     #action_num = port_num + {0}, or max degree + {0}
         
         self._num_steps = 0
         self._terminated = False
-        self._laststate = dict(nodes_feature = deepcopy(self.nodes_feature), probe = [[]])  #store probe paths
-        self._lastobs = deepcopy(self.nodes_feature)
-        self._remain_edge = deepcopy(self.edge_port_index)
+        #observations alternate between two preallocated buffers: the array returned by
+        #step()/reset() is owned by the env and stays valid until the second call after it,
+        #callers that keep observations longer must copy them
+        self._obs_buf = np.zeros((2,) + feat_shape)
+        self._mask_buf = np.zeros((2, self.edge_len*2+1), dtype=bool)     #masks over global actions
+        self._local_mask_buf = np.zeros((2, act_num), dtype=bool)
+        self._obs_idx = 0
+        self.mask = self._mask_buf[0]
+        self._laststate = dict(nodes_feature = self.nodes_feature, probe = [[]])  #store probe paths
+        self._lastobs = self._obs_buf[0, :, :self.telemetry_type]
+        np.copyto(self._lastobs, self.nodes_feature)
+        self._remain_port = self.all_port_bits      #bit p set while port p is unvisited
+        self._occupancy = 0         #bytes of the ports in the current probe
+        self.reset_probe_stats()
 
         self._steps_per_episode = self.edge_len*2   #ensure traversal of all ports
+        self._action_seq = np.zeros(self._steps_per_episode, dtype=np.int64)    #actions taken so far
+        self.state_size = 8 + self.nodes_feature.size + self.edge_len*2 + self.edge_len*2+1 + self._steps_per_episode
         
         
     @property
@@ -76,163 +118,238 @@ class TelemetryEnv(gym.Env):
 
     def step(self, action):
         assert not self._terminated, "One episodic has terminated"  # check if episode has ended
+        if self.local_actions and action != 0:  #k-th port of the current node -> global action
+            action = int(self.node_port_ptr[self._node]) + int(action)
+        self._action_seq[self._num_steps] = action
+
+        self._obs_idx ^= 1                      #write into the buffer not handed out last time
+        np.copyto(self._obs_buf[self._obs_idx], self._obs_buf[self._obs_idx ^ 1])
+        self._lastobs = self._obs_buf[self._obs_idx, :, :self.telemetry_type]
+        self.mask = self._mask_buf[self._obs_idx]
 
         if action == 0:         #create a new probe when action is 0
             self._laststate["probe"].append([]) 
+            self._occupancy = 0
+            self.add_probe_len()
             
-            mask_list = np.zeros(self.edge_len*2+1, dtype=int)
-            mask_list[np.array(self._remain_edge).flatten()+1] = 1
-            
-            mask_list[0] = 0    #prevent consecutive creation of new probes
-            self.mask = mask_list
+            self.mask[1:] = self.unpack_port_bits(self._remain_port)
+            self.mask[0] = False    #prevent consecutive creation of new probes
+            if self.local_actions:
+                self.set_node(int(np.argmax(self._remain_deg)))
             
         else:
-            action -= 1         #aciton~[0,30] port_num~[0,29] 
+            action = int(action)-1      #aciton~[0,30] port_num~[0,29] 
 
             #update current probe path
             action_edge_index = int(self.port_edge_index[action])    
-            remain_edge_index = [i for i, l in enumerate(self._remain_edge) if action in l][0]  
-            action_edge = self.edge_port_index[action_edge_index] 
             self._laststate["probe"][-1].append(int(action)) 
-            x_1 = [x for x in action_edge if x != action][0]   
+            x_1 = int(self.port_peer[action])
             self._laststate["probe"][-1].append(x_1)
+            self._occupancy += self.port_cost[action] + self.port_cost[x_1]
+            self.grow_probe_len(2)
             
             #update node feature matrix
-            port_req_sat = self.port_req[action_edge_index]
-            for x in port_req_sat:
-                self._lastobs[self.edge_index[0, action_edge_index], x-1] -=1
-                self._lastobs[self.edge_index[1, action_edge_index], x-1] -=1
+            req_sat = self.req_vec[self.req_bits[action_edge_index]]
+            u, v = self.edge_node[action_edge_index]
+            self._lastobs[u] -= req_sat
+            self._lastobs[v] -= req_sat
                 
-            self._remain_edge = np.delete(self._remain_edge, remain_edge_index, axis=0)
+            self._remain_port &= ~((1 << action) | (1 << x_1))
+            self._remain_deg[self.port_node[action]] -= 1
+            self._remain_deg[self.port_node[x_1]] -= 1
             self.clc_mask(x_1)                  #calculate action mask
+            if self.local_actions:
+                self.set_node(int(self.port_node[x_1]))
          
         reward = self.clc_rwd_cost()            #calculate short-term reward
 
         self._num_steps += 1
         if self._num_steps >= self._steps_per_episode or np.all(self._lastobs == 0):    #when all ports have been passed through
             self._terminated = True
-        info = {'num_steps': self._num_steps, 'mask': self.mask}
+        info = {'num_steps': self._num_steps}
         
         if self._terminated:
             reward += self.clc_final_rwd()      #calculate long-term reward
         
-        return self._lastobs, reward, self._terminated, info
+        return self.get_obs(), reward, self._terminated, info
 
     def reset(self):        #reset the environment
+        if self.scenarios is not None:
+            self.next_scenario()
+        return self.restart()
+
+    def restart(self):      #new episode on the requirements the env holds, the scenario bank is not advanced
         self._num_steps = 0
         self._terminated = False
-        state = self.nodes_feature
-        self._laststate = dict(nodes_feature = deepcopy(self.nodes_feature), probe = [[]])
-        self._lastobs = deepcopy(self.nodes_feature)
-        self._remain_edge = deepcopy(self.edge_port_index)
+        self._obs_idx ^= 1
+        self._lastobs = self._obs_buf[self._obs_idx, :, :self.telemetry_type]
+        np.copyto(self._lastobs, self.nodes_feature)
+        self._laststate = dict(nodes_feature = self.nodes_feature, probe = [[]])
+        self._remain_port = self.all_port_bits
+        self._remain_deg = np.diff(self.node_port_ptr)
+        self._occupancy = 0
+        self.reset_probe_stats()
         
-        mask_list = [1]*(self.edge_len*2+1)
-        mask_list[0] = 0
-        self.mask = mask_list
+        self.mask = self._mask_buf[self._obs_idx]
+        self.mask[:] = True
+        self.mask[0] = False
+        if self.local_actions:
+            self.set_node(int(np.argmax(self._remain_deg)))
         
-        return state, {'num_steps': self._num_steps, 'mask': self.mask}
+        return self.get_obs(), {'num_steps': self._num_steps}
+
+    def get_obs(self):
+        if self.local_actions:
+            return {"feat": self._obs_buf[self._obs_idx], "mask": self._local_mask_buf[self._obs_idx]}
+        return {"feat": self._lastobs, "mask": self.mask}
+
+    def set_node(self, node):           #local action mode: move to node, flag it and cut its ports out of the mask
+        self._node = node
+        feat = self._obs_buf[self._obs_idx]
+        feat[:, -1] = 0
+        feat[node, -1] = 1
+        lo, hi = self.node_port_ptr[node], self.node_port_ptr[node+1]
+        local_mask = self._local_mask_buf[self._obs_idx]
+        local_mask[:] = False
+        local_mask[0] = self.mask[0]
+        local_mask[1:1+hi-lo] = self.mask[1+lo:1+hi]
+
+    def get_state(self):
+        """Flat float64 snapshot of the episode, the requirements (req_bits) are not included."""
+        port_num = self.edge_len*2
+        state = np.empty(self.state_size)
+        state[:8] = (self._num_steps, self._terminated, self._occupancy, self._probe_num,
+                     self._probe_len, self._len_mean, self._len_m2, self._node)
+        o = 8
+        state[o:o+self._lastobs.size] = self._lastobs.ravel()
+        o += self._lastobs.size
+        state[o:o+port_num] = self.unpack_port_bits(self._remain_port)
+        o += port_num
+        state[o:o+port_num+1] = self.mask
+        o += port_num+1
+        state[o:] = self._action_seq
+        return state
+
+    def set_state(self, state):
+        """Restore an episode captured by :meth:`get_state` and return its observation."""
+        port_num = self.edge_len*2
+        self._num_steps = int(state[0])
+        self._terminated = bool(state[1])
+        self._occupancy = int(state[2])
+        self._probe_num = int(state[3])
+        self._probe_len = int(state[4])
+        self._len_mean = float(state[5])
+        self._len_m2 = float(state[6])
+
+        self._obs_idx ^= 1
+        self._lastobs = self._obs_buf[self._obs_idx, :, :self.telemetry_type]
+        self.mask = self._mask_buf[self._obs_idx]
+        o = 8
+        self._lastobs[...] = state[o:o+self._lastobs.size].reshape(self._lastobs.shape)
+        o += self._lastobs.size
+        remain = state[o:o+port_num] > 0
+        self._remain_port = int.from_bytes(np.packbits(remain, bitorder='little').tobytes(), 'little')
+        self._remain_deg = np.bincount(self.port_node[remain], minlength=self.nodes_num)
+        o += port_num
+        self.mask[:] = state[o:o+port_num+1] > 0
+        o += port_num+1
+        self._action_seq[:] = state[o:]
+
+        probe = [[]]                            #probe paths follow from the actions
+        for a in self._action_seq[:self._num_steps]:
+            if a == 0:
+                probe.append([])
+            else:
+                probe[-1] += [int(a-1), int(self.port_peer[a-1])]
+        self._laststate = dict(nodes_feature = self.nodes_feature, probe = probe)
+        if self.local_actions:
+            self.set_node(int(state[7]))
+        return self.get_obs()
     
     def clc_rwd_cost(self):    
         cu_probe = self._laststate["probe"][-1]     #get current probe path
-        cu_probe = cu_probe[0:-1]                   #ports with increased overhead
         cost = 0
-        for x in cu_probe:
-            cu_edge_index = int(self.port_edge_index[x])
-            cu_prot_item = self.port_req[cu_edge_index]
-            for y in cu_prot_item:
-                cost += self.C_m[y-1]   
+        if cu_probe:                                #the last port adds no overhead yet
+            cost = self._occupancy - self.port_cost[cu_probe[-1]]
         rwd = -cost * self.norm_param               #calculate short-term reward
         
         return rwd
     
     def clc_final_rwd(self):
         
-        probe_len = [len(x) for x in self._laststate["probe"]]  
-        max_probe_len = max(probe_len)  
-        probe_num = len(probe_len)                      #number of probe paths
-        probe_var = [x for x in probe_len if x != 0]    #variance of probe lengths
-        if probe_num == 1:  
-            probe_var = 0
-        else:
-            probe_var = pvariance(probe_len)
+        probe_num = self._probe_num                     #number of probe paths
+        probe_var = self._len_m2 / probe_num            #population variance of probe lengths
         rwd = -(self.alpha*probe_var + self.beta*probe_num) * self.norm_param_final + self.bal_param    #calculate long-term reward
         
         return rwd
     
+    #running count, mean and M2 of probe lengths (Welford), the open probe is the last sample
+    def reset_probe_stats(self):
+        self._probe_num = 1
+        self._probe_len = 0
+        self._len_mean = 0.0
+        self._len_m2 = 0.0
+
+    def add_probe_len(self):                #a new empty probe is opened
+        self._probe_num += 1
+        self._probe_len = 0
+        delta = -self._len_mean
+        self._len_mean += delta / self._probe_num
+        self._len_m2 += delta * -self._len_mean
+
+    def grow_probe_len(self, d):            #the open probe gets d more ports
+        old_mean = self._len_mean
+        self._len_mean += d / self._probe_num
+        self._len_m2 += d * (2*self._probe_len + d - old_mean - self._len_mean)
+        self._probe_len += d
+
     def clc_mask(self, x):
         
-        mask_list = [0]*(self.edge_len*2+1)                 #0~infeasible,1~feasible
-
-        cu_probe = self._laststate["probe"][-1]             #get current probe path
-        occupancy = 0
-        for x in cu_probe:                                  #probe packet length in bytes
-            cu_edge_index = int(self.port_edge_index[x])
-            cu_prot_item = self.port_req[cu_edge_index]
-            for y in cu_prot_item:
-                occupancy += self.C_m[y-1]
-        occupancy += self.fixed
-
-        if occupancy > self.MTU - 2*sum(self.C_m):          
-            mask_list[0] = 1                                #MTU constraint
+        self.mask[:] = False                                #False~infeasible,True~feasible
+
+        occupancy = self._occupancy + self.fixed            #probe packet length in bytes
+
+        if occupancy > self.mtu_limit:          
+            self.mask[0] = True                             #MTU constraint
         else:
-            other_ports = None
-            for k, v in self.node_port.items():             #ensure probe paths are valid and connected
-                if x in v:
-                    other_ports = deepcopy(v)
-                    other_ports.remove(x)
-                    break
-            
-            for p in other_ports:                           #ensure probe paths are non-redundant
-                if any(p in _ for _ in self._remain_edge):
-                    mask_list[p+1] = 1
+            node = self.port_node[x]                        #ensure probe paths are valid and connected
+            feasible = self.node_port_bits[node] & self._remain_port    #ensure probe paths are non-redundant
+            self.mask[1:] = self.unpack_port_bits(feasible)
+            self.mask[0] = True
     
-            mask_list[0] = 1
+    @property
+    def port_req(self):                 #requirements as lists of item ids, one list per edge
+        return scenario_port_req(self.req_bits, self.telemetry_type)
 
-        self.mask = mask_list
-    
     def get_port_req(self):
-        self.port_req = []
+        port_req = []
         edge_num = self.edge_index.shape[1] 
         for _ in range(edge_num):
             items_num = random.randint(2, self.telemetry_type) 
             edgex_item =random.sample(range(1, self.telemetry_type+1), items_num) 
-            self.port_req.append(edgex_item)
+            port_req.append(edgex_item)
+        self.req_bits = np.array([sum(1 << (x-1) for x in items) for items in port_req], dtype=np.int64)
         
-    def get_nodes_feature(self):    
-        self.nodes_feature = np.zeros((self.nodes_num, self.telemetry_type))
-        edge_num = self.edge_index.shape[1]
-        for edge in range(edge_num):   
-            for x in self.port_req[edge]:
-                self.nodes_feature[self.edge_index[0, edge], x-1] +=1
-                self.nodes_feature[self.edge_index[1, edge], x-1] +=1
-        
-    def get_node_port(self):
-        flat_list = [item for sublist in self.edge_index_0 for item in sublist]
-        element_counts = dict(Counter(flat_list))
+    def set_port_req(self, port_req):    #swap in new requirements, takes effect from the next reset()
+        self.set_req_bits([sum(1 << (x-1) for x in items) for items in port_req])
 
-        for i in range(self.nodes_num-1):
-            element_counts[i+1] += element_counts[i]
+    def set_req_bits(self, req_bits):
+        self.req_bits = np.asarray(req_bits, dtype=np.int64)
+        self.get_nodes_feature()
+        self.get_port_cost()
 
-        for i in range(self.nodes_num):
-            if i != self.nodes_num - 1:
-                element_counts[self.nodes_num - i -1] = list(range(element_counts[self.nodes_num - i -2], element_counts[self.nodes_num - i -1]))
-            else:
-                element_counts[self.nodes_num - i -1] = list(range(element_counts[self.nodes_num - i -1]))
-        
-        self.node_port = element_counts
-        
-    def get_edge_port_index(self):
-        node_port_0 = deepcopy(self.node_port)
-        edge_index_00 = deepcopy(self.edge_index_0)
-        edge_index_00 = np.array(edge_index_00)
-        for edge in edge_index_00:
-            x1 = node_port_0[edge[0]].pop(0)
-            edge[0] = x1
-
-            x2 = node_port_0[edge[1]].pop(0)
-            edge[1] = x2
-
-        self.edge_port_index = edge_index_00
+    def next_scenario(self):
+        if self.sample_scenarios:
+            self._scenario = int(self._scenario_rng.integers(len(self.scenarios)))
+        else:
+            self._scenario = (self._scenario + 1) % len(self.scenarios)
+        self.set_req_bits(self.scenarios[self._scenario])
+
+    def get_nodes_feature(self):    
+        self.nodes_feature = np.zeros((self.nodes_num, self.telemetry_type))
+        edge_req = self.req_vec[self.req_bits]                  #(E, T) items collected on each edge
+        np.add.at(self.nodes_feature, self.edge_node[:, 0], edge_req)
+        np.add.at(self.nodes_feature, self.edge_node[:, 1], edge_req)
         
     def get_C_m(self):
         #random
@@ -242,12 +359,33 @@ class TelemetryEnv(gym.Env):
         for i in range(self.telemetry_type):
             self.C_m = [1, 2, 3, 4, 6]
 
-    def get_port_edge(self):
-        i = 0
-        for x in self.edge_port_index:
-            self.port_edge_index[x[0]] = i
-            self.port_edge_index[x[1]] = i
-            i += 1
+    def get_req_tables(self):          #lookup tables indexed by a requirement mask
+        masks = np.arange(1 << self.telemetry_type)
+        self.req_vec = (masks[:, None] >> np.arange(self.telemetry_type) & 1).astype(np.float64)   #(2^T, T) items in the mask
+        self.req_cost = (self.req_vec @ np.array(self.C_m)).astype(np.int64)                         #(2^T,) bytes of the mask
+
+    def get_port_cost(self):
+        self.port_cost = self.req_cost[self.req_bits][self.port_edge_index]
+
+    def get_port_tables(self):
+        port_num = self.edge_len*2
+        self.edge_port_index = self.topo["edge_port_index"]
+        self.port_edge_index = self.topo["port_edge"]
+        self.port_node = self.topo["port_node"]
+        self.port_peer = self.topo["port_peer"]
+        self.node_port_ptr = self.topo["node_port_ptr"]        #ports of node i are node_port_ptr[i]:node_port_ptr[i+1]
+        self.node_port = {i: list(range(self.node_port_ptr[i], self.node_port_ptr[i+1])) for i in range(self.nodes_num)}
+        self.hop_key = self.topo["hop_key"]                      #sorted u*V+v of every directed hop
+        self.hop_port = self.topo["hop_port"]                    #(port at u, port at v) of each hop
+
+        #port bitmasks, bit p stands for port p
+        self.all_port_bits = (1 << port_num) - 1
+        self.node_port_bits = [(1 << int(self.node_port_ptr[i+1])) - (1 << int(self.node_port_ptr[i])) for i in range(self.nodes_num)]
+
+    def unpack_port_bits(self, bits):       #port bitmask -> bool array over ports
+        port_num = self.edge_len*2
+        packed = np.frombuffer(bits.to_bytes((port_num+7)//8, 'little'), dtype=np.uint8)
+        return np.unpackbits(packed, bitorder='little')[:port_num].view(bool)
 
     def handle_probe(self, probe):          #data plane input
         probe_dp = []
@@ -258,61 +396,81 @@ class TelemetryEnv(gym.Env):
 
         return probe_dp_final
 
+    def find_hop_ports(self, start, end):   #ports crossed by the hops start[i] -> end[i], shape (H, 2)
+        key = np.asarray(start, dtype=np.int64)*self.nodes_num + np.asarray(end, dtype=np.int64)
+        idx = np.searchsorted(self.hop_key, key)
+        idx[idx == len(self.hop_key)] = 0
+        missing = self.hop_key[idx] != key
+        if missing.any():
+            k = int(key[missing][0])
+            raise KeyError("no edge between switch %d and %d" % divmod(k, self.nodes_num))
+        return self.hop_port[idx]
+
     def handle_sw(self, sw):                #convert the probe paths composed of switch nodes into those composed of ports
-        def find_edge_index(start, end, edge_dict):
-            for index, p in enumerate(edge_dict):
-                order_ = 0
-                if (p[0] == start and p[1] == end) or (p[0] == end and p[1] == start):
-                    if (p[0] == start and p[1] == end):
-                        order_ = 1 
-                    if (p[0] == end and p[1] == start):
-                        order_ = 0 
-                    return index, order_
-            return None
-        
-        all_port_lists = []
-
-        for point_sequence in sw:
-            edge_indices = []
-            order_list = []
-            for i in range(len(point_sequence) - 1):
-                start_point = point_sequence[i]
-                end_point = point_sequence[i + 1]
-                edge_index, order_ = find_edge_index(start_point, end_point, self.edge_index_0)
-                if edge_index is not None:
-                    edge_indices.append(edge_index)
-                    order_list.append(order_)
-
-            port_list = []
-            for idx, edge_index in enumerate(edge_indices):
-                ports = self.edge_port_index[edge_index]
-                if order_list[idx] == 1:
-                    port_list.extend(ports)
-                else:
-                    port_list.append(ports[1])
-                    port_list.append(ports[0])
-            
-            all_port_lists.append(port_list)
-        
-        return all_port_lists
+        return self.handle_sw_batch([sw])[0]
+
+    def handle_sw_batch(self, sw_plans, dp = False):    #handle_sw over many plans with one lookup, handle_probe form if dp
+        seqs = [np.asarray(point_sequence, dtype=np.int64) for sw in sw_plans for point_sequence in sw]
+        hops = [max(len(s)-1, 0) for s in seqs]
+        if sum(hops):
+            start = np.concatenate([s[:-1] for s in seqs])
+            end = np.concatenate([s[1:] for s in seqs])
+            ports = self.find_hop_ports(start, end)
+        else:
+            ports = np.zeros((0, 2), dtype=np.int64)
+        port_lists = [p.reshape(-1).tolist() for p in np.split(ports, np.cumsum(hops)[:-1])] if seqs else []
+
+        all_plans, k = [], 0
+        for sw in sw_plans:
+            plan = port_lists[k:k+len(sw)]
+            k += len(sw)
+            all_plans.append(self.handle_probe(plan) if dp else plan)
+        return all_plans
 
     def seed(self, seed = None):
         random.seed(seed)
+        self._scenario_rng = np.random.default_rng(seed)
+        self._scenario = -1         #cycling restarts from the first scenario
+
+VECTOR_ENVS = {
+    "dummy": DummyVectorEnv,        #all envs stepped in this process
+    "subproc": SubprocVectorEnv,    #one process per env, results sent through pipes
+    "shmem": ShmemVectorEnv,        #one process per env, observations and masks in shared memory
+}
 
-def make_telemetry_env(training_num = 0, test_num = 0):
+def make_telemetry_env(training_num = 0, test_num = 0, backend = "dummy", scenario_num = 0, test_scenario_num = 0, scenario_seed = 0, local_actions = False):
     
-    env = TelemetryEnv()
+    assert not (local_actions and backend == "batched"), "the batched backend only supports global actions"
+    env = TelemetryEnv(local_actions=local_actions)
     env.seed(0)
+    #requirement banks: training envs sample the training bank, test env i cycles
+    #through its share of the evaluation bank, so every test run sees the same scenarios
+    train_bank, test_bank = None, None
+    if scenario_num:
+        train_bank = make_scenarios(env.edge_len, scenario_num, scenario_seed, env.telemetry_type)
+    if test_scenario_num:
+        test_bank = make_scenarios(env.edge_len, test_scenario_num, scenario_seed+1, env.telemetry_type)
+    topo = env.topo     #compiled once, shared by every worker below
+    if backend in ("subproc", "shmem"):     #workers attach to one read-only copy in shared memory
+        shm, topo = share_topology(env.topo)
+        atexit.register(release_topology, shm)
+
+    def make_envs(num, bank, sample):
+        if backend == "batched":    #step all episodes together in stacked arrays
+            from env.batched_env import BatchedTelemetryEnv
+            return BatchedTelemetryEnv(num, env.graphml_file, scenarios=bank, sample_scenarios=sample)
+        def make_env(i):
+            share = bank if bank is None or sample else bank[i % len(bank)::num]
+            return lambda: TelemetryEnv(env.graphml_file, topo=topo, scenarios=share, sample_scenarios=sample, local_actions=local_actions)
+        return VECTOR_ENVS[backend]([make_env(i) for i in range(num)])
     
     train_envs, test_envs = None, None
     if training_num:    #create multiple instances of the environment for training
-        train_envs = DummyVectorEnv(
-            [lambda: TelemetryEnv() for _ in range(training_num)])
+        train_envs = make_envs(training_num, train_bank, True)
         train_envs.seed(0)
 
     if test_num:        #create multiple instances of the environment for testing
-        test_envs = DummyVectorEnv(
-            [lambda: TelemetryEnv() for _ in range(test_num)])
+        test_envs = make_envs(test_num, test_bank, False)
         test_envs.seed(0)
         
     return env, train_envs, test_envs
@@ -20,6 +20,8 @@ from tianshou.policy import BasePolicy
 
 from tianshou.data import Collector
 
+from env.plan_archive import PlanArchive
+
 class path_Collector(Collector):
     def __init__(
         self,
@@ -28,6 +30,7 @@ class path_Collector(Collector):
         buffer: Optional[ReplayBuffer] = None,
         preprocess_fn: Optional[Callable[..., Batch]] = None,
         exploration_noise: bool = False,
+        archive: Optional[PlanArchive] = None,
     ) -> None:
         super().__init__(policy, env)
         if isinstance(env, gym.Env) and not hasattr(env, "__len__"):
@@ -41,6 +44,8 @@ class path_Collector(Collector):
         self.policy = policy
         self.preprocess_fn = preprocess_fn
         self._action_space = self.env.action_space
+        self.archive = PlanArchive() if archive is None else archive     #elite plans of every env, may be shared by collectors
+        self.workloads = {}         #(graph, requirement scenario) of the finished episodes, in order of appearance
         # avoid creating attribute outside __init__
         self.reset(False)
         
@@ -117,6 +122,7 @@ class path_Collector(Collector):
         episode_rews = []
         episode_lens = []
         episode_start_indices = []
+        probe_path, probe_rew = None, -np.inf      #best plan of this call
 
         while True:
             assert len(self.data) == len(ready_env_ids)
@@ -213,10 +219,13 @@ class path_Collector(Collector):
                 episode_lens.append(ep_len[env_ind_local])
                 episode_rews.append(ep_rew[env_ind_local])
                 episode_start_indices.append(ep_idx[env_ind_local])
-                
-                if max(episode_rews) == episode_rews[-1]:       #output the optimal probe paths
-                    probe_path = self.env.workers[0].env._laststate["probe"]
-                
+
+                #archive the plans before the envs are reset
+                probes = self.archive_plans(env_ind_global, ep_rew[env_ind_local])
+                i = int(np.argmax(ep_rew[env_ind_local]))
+                if ep_rew[env_ind_local][i] > probe_rew:
+                    probe_rew, probe_path = ep_rew[env_ind_local][i], probes[i]
+
                 # now we copy obs_next to obs, but since there might be
                 # finished episodes, we have to reset finished envs first.
                 self._reset_env_with_ids(
@@ -284,4 +293,13 @@ class path_Collector(Collector):
             "rew_std": rew_std,
             "len_std": len_std,
             "probe_path": probe_path,
-        } 
\ No newline at end of file
+        }
+
+    def archive_plans(self, env_ids, rews):        #offer finished episodes to the archive, returns their probe paths
+        probes = [[list(p) for p in state["probe"]] for state in self.env.get_env_attr("_laststate", env_ids)]
+        graphs = self.env.get_env_attr("graphml_file", env_ids)
+        scenarios = self.env.get_env_attr("req_bits", env_ids)
+        for rew, probe, graph, scenario in zip(rews, probes, graphs, scenarios):
+            self.archive.add(rew, probe, graph, scenario)
+            self.workloads.setdefault(PlanArchive.workload(graph, scenario), None)
+        return probes 
\ No newline at end of file
@@ -0,0 +1,81 @@
+import heapq
+import json
+import os
+
+class PlanArchive:
+    """Top-``k`` distinct probe plans per workload (graph, requirement scenario), optionally persisted as JSON."""
+
+    def __init__(self, k = 10, path = None):
+        self.k = k
+        self.path = path
+        self._heaps = {}        #workload -> heap of (reward, insertion count, key), worst plan on top
+        self._plans = {}        #key -> plan
+        self._count = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._plans)
+
+    @staticmethod
+    def workload(graph = None, scenario = None):        #hashable (graph, requirement masks) key
+        return (graph, None if scenario is None else tuple(int(m) for m in scenario))
+
+    def add(self, reward, probe, graph = None, scenario = None):
+        """Offer a finished episode of ``scenario`` on ``graph``, returns True if it entered the archive."""
+        workload = self.workload(graph, scenario)
+        key = workload + (tuple(tuple(p) for p in probe),)
+        if key in self._plans:
+            return False
+        heap = self._heaps.setdefault(workload, [])
+        reward = float(reward)
+        entry = (reward, self._count, key)
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif reward > heap[0][0]:
+            _, _, worst = heapq.heapreplace(heap, entry)
+            del self._plans[worst]
+        else:
+            return False
+        self._count += 1
+        self._plans[key] = dict(reward=reward, probe=[list(p) for p in probe], graph=graph,
+                                scenario=None if workload[1] is None else list(workload[1]))
+        return True
+
+    def workloads(self):
+        return list(self._heaps)
+
+    def best(self, n = None, graph = None, scenario = None):
+        """Archived plans, best first, optionally only those of ``graph`` and/or ``scenario``."""
+        plans = self._plans.items()
+        if graph is not None:
+            plans = [(key, plan) for key, plan in plans if key[0] == graph]
+        if scenario is not None:
+            masks = self.workload(None, scenario)[1]
+            plans = [(key, plan) for key, plan in plans if key[1] == masks]
+        return sorted((plan for _, plan in plans), key=lambda plan: plan["reward"], reverse=True)[:n]
+
+    def elites(self, workloads = None, n = None):
+        """Best plans of each of ``workloads`` (None or empty: all), one dict with ``graph``, ``scenario`` and ``plans`` each."""
+        workloads = workloads or self.workloads()
+        elites = []
+        for graph, masks in workloads:
+            heap = self._heaps.get(self.workload(graph, masks), [])
+            plans = sorted((self._plans[key] for _, _, key in heap), key=lambda plan: plan["reward"], reverse=True)
+            elites.append(dict(graph=graph, scenario=None if masks is None else list(masks), plans=plans[:n]))
+        return elites
+
+    def save(self, path = None):
+        path = self.path if path is None else path
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(self.best(), f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        with open(path) as f:
+            for plan in json.load(f):
+                self.add(plan["reward"], plan["probe"], plan.get("graph"), plan.get("scenario"))
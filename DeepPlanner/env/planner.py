@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+import torch
+
+def copy_obs(obs):          #env observations are views into buffers the env reuses
+    return {k: np.array(v) for k, v in obs.items()}
+
+def beam_search_plan(actor, env, beam_width = 1, scenario = None, time_budget = None, on_improve = None):
+    """Width-``beam_width`` beam search over the actor's masked log-probabilities, returns the best finished plan."""
+    deadline = None if time_budget is None else time.time() + time_budget
+    device = next(actor.parameters()).device
+    if scenario is not None:
+        env.set_req_bits(scenario)
+    obs, _ = env.restart()      #a scenario bank is not advanced, repeated calls plan the same workload
+    edge_index = None if "topo" in obs else env.edge_index.to(device)      #one tensor for the whole search
+
+    beams = [(0.0, 0.0, env.get_state(), copy_obs(obs))]       #(log-probability, reward, state, obs)
+    finished = []
+    best = None
+    while beams:
+        if deadline is not None and time.time() >= deadline:      #out of time: stop, or finish the likeliest beam alone
+            if best is not None:
+                break
+            beams, beam_width = beams[:1], 1
+        feat = torch.as_tensor(np.stack([b[3]["feat"] for b in beams]), dtype=torch.float32, device=device)
+        mask = torch.as_tensor(np.stack([b[3]["mask"] for b in beams]), device=device)
+        if edge_index is None:
+            graph = torch.as_tensor(np.stack([b[3]["topo"] for b in beams]), dtype=torch.long, device=device)
+        else:
+            graph = edge_index
+        with torch.no_grad():
+            logits = actor.get_logits(feat, graph)
+        logp = torch.log_softmax(logits.masked_fill(~mask, float("-inf")), dim=-1)
+        score = torch.as_tensor([b[0] for b in beams], dtype=logp.dtype, device=device)[:, None] + logp
+        k = min(beam_width, int(mask.sum()))
+        top = torch.topk(score.flatten(), k)
+
+        children = []
+        for s, flat in zip(top.values.tolist(), top.indices.tolist()):
+            i, action = divmod(flat, score.shape[1])
+            env.set_state(beams[i][2])
+            obs, rew, done, _ = env.step(action)
+            if done:
+                finished.append(dict(
+                    probe = [list(p) for p in env._laststate["probe"]],
+                    actions = env._action_seq[:env._num_steps].copy(),
+                    reward = beams[i][1]+rew,
+                    logp = s,
+                ))
+                if best is None or finished[-1]["reward"] > best["reward"]:
+                    best = finished[-1]
+                    if on_improve is not None:
+                        on_improve(best)
+            else:
+                children.append((s, beams[i][1]+rew, env.get_state(), copy_obs(obs)))
+        beams = children
+
+    return best
+
+def greedy_plan(actor, env, scenario = None):
+    """Take the most likely feasible action at every step, see :func:`beam_search_plan`."""
+    return beam_search_plan(actor, env, 1, scenario)
+
+def anytime_plan(actor, env, time_budget, scenario = None, on_improve = None, max_width = 256):
+    """Greedy, then beam searches of doubling width until ``time_budget`` seconds are spent."""
+    deadline = time.time() + time_budget
+    best = None
+    def improve(plan):
+        nonlocal best
+        if best is None or plan["reward"] > best["reward"]:
+            best = dict(plan, beam_width=width)
+            if on_improve is not None:
+                on_improve(best)
+    width = 1
+    while width <= max_width:
+        beam_search_plan(actor, env, width, scenario, max(deadline - time.time(), 0), improve)
+        if time.time() >= deadline:
+            break
+        width *= 2
+    return best
@@ -0,0 +1,26 @@
+import torch
+from tianshou.data import Batch, to_torch
+
+class TelemetryPolicyMixin:
+    """Observation and minibatch helpers of the telemetry policies, which set ``_device`` and ``edge_index``."""
+
+    def graph_of(self, obs):        #graph input of the models: env edge_index, or topo ids of padded multi-topology observations
+        if "topo" in obs.keys():
+            return to_torch(obs.topo, device=self._device, dtype=torch.long)
+        return self.edge_index
+
+    def obs_to_torch(self, obs):        #feat/mask(/topo) of a rollout as tensors on the device
+        obs_ = Batch(feat=to_torch(obs.feat, device=self._device, dtype=torch.float32),
+                     mask=to_torch(obs.mask, device=self._device, dtype=torch.bool))
+        if "topo" in obs.keys():
+            obs_.topo = to_torch(obs.topo, device=self._device, dtype=torch.long)
+        return obs_
+
+    def minibatch_indices(self, size, batch_size):      #shuffled index slices on the device, short tail merged as in Batch.split(merge_last=True)
+        perm = torch.randperm(size, device=self._device)
+        bounds = list(range(0, size, batch_size))
+        if len(bounds) > 1 and size - bounds[-1] < batch_size:
+            bounds.pop()
+        bounds.append(size)
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            yield perm[lo:hi]
@@ -0,0 +1,119 @@
+import importlib
+import os
+import sys
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+#baseline planners of other_algo/ (next to DeepPlanner/), name -> (module, function)
+BASELINES = {
+    "dfs": ("other_algo.dfs", "get_dfs_path"),
+    "eulerun": ("other_algo.euler_unbalance", "get_eulerun_path"),
+    "euler": ("other_algo.euler_balance", "get_euler_path"),
+    "intbalance": ("other_algo.INT_balance", "get_intbalance_path"),
+}
+
+def baseline_plans(env, names = tuple(BASELINES), repeats = 1):
+    """``(name, probe)`` port plans of the baseline planners on the graph of ``env``."""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if root not in sys.path:            #other_algo is a sibling of DeepPlanner
+        sys.path.append(root)
+    runs = []
+    for name in names:
+        module, func = BASELINES[name]
+        get_path = getattr(importlib.import_module(module), func)
+        runs += [(name, get_path(env.graphml_file)) for _ in range(repeats)]
+    port_plans = env.handle_sw_batch([sw for _, sw in runs])
+    return [(name, probe) for (name, _), probe in zip(runs, port_plans)]
+
+def roll_plan(env, probe, scenario = None, gamma = 0.99):
+    """Replay a port plan through ``env``, repairing steps it refuses, and record it as a demonstration."""
+    assert not env.local_actions, "demonstrations are recorded with global actions"
+    if scenario is not None:
+        env.set_req_bits(scenario)
+    obs, _ = env.restart()      #a scenario bank is not advanced
+    feats, masks, acts, rews = [], [], [], []
+    done = False
+
+    def take(action):
+        nonlocal obs, done
+        feats.append(np.array(obs["feat"]))         #env observations are reused buffers
+        masks.append(np.array(obs["mask"]))
+        acts.append(action)
+        obs, rew, done, _ = env.step(action)
+        rews.append(rew)
+
+    for i, path in enumerate(probe):
+        new_probe = i > 0
+        for port in path[0::2]:                     #every hop is (port at u, peer port at v)
+            if done:
+                break
+            if not env._remain_port >> port & 1:    #edge already covered by an earlier hop
+                continue
+            if (new_probe or not obs["mask"][port+1]) and obs["mask"][0]:
+                take(0)
+                new_probe = False
+                if done:
+                    break
+            take(port+1)
+    while not done:
+        ports = np.flatnonzero(obs["mask"][1:])
+        take(int(ports[0])+1 if len(ports) else 0)
+
+    ret = np.zeros(len(rews))
+    g = 0.0
+    for t in range(len(rews)-1, -1, -1):
+        g = rews[t] + gamma*g
+        ret[t] = g
+    return dict(
+        feat = np.stack(feats).astype(np.float32),
+        mask = np.stack(masks),
+        act = np.array(acts, dtype=np.int64),
+        ret = ret.astype(np.float32),
+        reward = float(sum(rews)),
+        probe = [list(p) for p in env._laststate["probe"]],
+    )
+
+def make_demos(env, plans, scenarios = None, gamma = 0.99, best_only = True):
+    """Stacked demonstrations of ``plans`` on every scenario and the reward of each plan."""
+    req_bits = env.req_bits.copy()
+    if scenarios is None:
+        scenarios = [req_bits]
+    episodes, rewards = [], []
+    for scenario in scenarios:
+        runs = [(name, roll_plan(env, probe, scenario, gamma)) for name, probe in plans]
+        rewards.append([(name, run["reward"]) for name, run in runs])
+        if best_only:
+            runs = [max(runs, key=lambda run: run[1]["reward"])]
+        episodes += [run for _, run in runs]
+    env.set_req_bits(req_bits)
+    demos = {k: np.concatenate([e[k] for e in episodes]) for k in ("feat", "mask", "act", "ret")}
+    return demos, rewards
+
+def behavior_clone(actor, demos, graph, epochs, batch_size = 512, lr = 1e-3, critic = None):
+    """Fit ``actor`` (and ``critic`` on the returns) to the demonstrations, returns per-epoch loss and accuracy."""
+    device = graph.device
+    modules = nn.ModuleList([actor] if critic is None else [actor, critic])     #a shared GCN is updated once
+    optim = torch.optim.Adam(modules.parameters(), lr=lr)
+    feat = torch.as_tensor(demos["feat"], device=device)
+    mask = torch.as_tensor(demos["mask"], device=device)
+    act = torch.as_tensor(demos["act"], device=device)
+    ret = torch.as_tensor(demos["ret"], device=device)
+    stats = dict(loss=[], acc=[])
+    for _ in range(epochs):
+        losses, hits = [], 0
+        for idx in torch.randperm(len(act), device=device).split(batch_size):
+            logits = actor.get_logits(feat[idx], graph).masked_fill(~mask[idx], float("-inf"))
+            loss = F.cross_entropy(logits, act[idx])
+            if critic is not None:
+                loss = loss + F.mse_loss(critic(feat[idx], graph), ret[idx])
+            optim.zero_grad()
+            loss.backward()
+            optim.step()
+            losses.append(loss.item())
+            hits += (logits.argmax(-1) == act[idx]).sum().item()
+        stats["loss"].append(float(np.mean(losses)))
+        stats["acc"].append(hits / len(act))
+    return stats
@@ -0,0 +1,40 @@
+import numpy as np
+
+from tianshou.data import Batch, VectorReplayBuffer
+
+class TelemetryVectorReplayBuffer(VectorReplayBuffer):
+    """VectorReplayBuffer storing uint8 features and bit-packed masks, without obs_next."""
+
+    def __init__(self, total_size, buffer_num, **kwargs):
+        kwargs["ignore_obs_next"] = True
+        super().__init__(total_size, buffer_num, **kwargs)
+        self.options["ignore_obs_next"] = True
+        self._mask_len = None           #action count, needed to unpack the masks
+
+    def pack_obs(self, obs):
+        feat = np.asarray(obs.feat)
+        assert feat.min() >= 0 and feat.max() <= 255, "node features do not fit in uint8"
+        mask = np.asarray(obs.mask, dtype=bool)
+        self._mask_len = mask.shape[-1]
+        obs_ = Batch(feat=feat.astype(np.uint8), mask=np.packbits(mask, axis=-1))
+        if "topo" in obs.keys():
+            obs_.topo = np.asarray(obs.topo, dtype=np.int16)
+        return obs_
+
+    def unpack_obs(self, obs):
+        obs_ = Batch(feat=obs.feat, mask=np.unpackbits(obs.mask, axis=-1, count=self._mask_len).astype(bool))
+        if "topo" in obs.keys():
+            obs_.topo = obs.topo.astype(np.int64)
+        return obs_
+
+    def add(self, batch, buffer_ids = None):
+        batch = Batch({k: batch[k] for k in batch.keys()})     #shallow copy, the collector keeps its own obs
+        batch.obs = self.pack_obs(batch.obs)
+        batch.pop("obs_next", None)
+        return super().add(batch, buffer_ids)
+
+    def get(self, index, key, default_value = None, stack_num = None):
+        val = super().get(index, key, default_value, stack_num)
+        if key == "obs" and isinstance(val, Batch) and not val.is_empty():
+            val = self.unpack_obs(val)
+        return val
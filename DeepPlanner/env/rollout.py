@@ -0,0 +1,201 @@
+import time
+
+import numpy as np
+import torch
+
+from tianshou.data import Batch, ReplayBuffer, to_numpy
+
+from env.plan_archive import PlanArchive
+
+class RolloutBlock(ReplayBuffer):
+    """A filled rollout laid out env-major like a VectorReplayBuffer, handed to the policies as a buffer."""
+
+    def __init__(self, batch, env_num):
+        super().__init__(len(batch), ignore_obs_next=True)
+        self.set_batch(batch)
+        self._size = len(batch)
+        self.env_num = env_num
+        self.block_len = len(batch) // env_num
+        self.last_index = np.arange(1, env_num+1) * self.block_len - 1    #last step of every env
+
+    def prev(self, index):
+        index = np.asarray(index)
+        start = (index % self.block_len == 0) | self.done[index-1]
+        return np.where(start, index, index-1)
+
+    def next(self, index):
+        index = np.asarray(index)
+        end = self.done[index] | (index % self.block_len == self.block_len-1)
+        return np.where(end, index, index+1)
+
+    def unfinished_index(self):
+        return self.last_index[~self.done[self.last_index]]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            index = self._indices[index]
+        return Batch(
+            obs=self.obs[index],
+            act=self.act[index],
+            rew=self.rew[index],
+            terminated=self.terminated[index],
+            truncated=self.truncated[index],
+            done=self.done[index],
+        )
+
+class RolloutCollector:
+    """Lean on-policy collector writing a vector env's steps into preallocated arrays."""
+
+    def __init__(self, policy, env, block_len = 64, archive = None):
+        self.policy = policy
+        self.env = env
+        self.env_num = len(env)
+        self.archive = PlanArchive() if archive is None else archive
+        self.workloads = {}         #(graph, requirement scenario) of the finished episodes, in order of appearance
+        self.buffer = None
+        obs, _ = env.reset()
+        feat, mask, topo = self.split_obs(obs)
+        self.alloc(block_len, feat.shape[1:], mask.shape[1], topo is not None)
+        self.write_obs(0, np.arange(self.env_num), obs)
+        self._ep_rew = np.zeros(self.env_num)
+        self._ep_len = np.zeros(self.env_num, dtype=np.int64)
+        self.reset_stat()
+
+    def alloc(self, block_len, feat_shape, act_num, topo):     #(T+1, N, ...) observations, slot T holds the obs after the block
+        N = self.env_num
+        self.block_len = block_len
+        self.feat = np.zeros((block_len+1, N) + tuple(feat_shape), dtype=np.float32)
+        self.mask = np.zeros((block_len+1, N, act_num), dtype=bool)
+        self.topo = np.zeros((block_len+1, N), dtype=np.int64) if topo else None
+        self.act = np.zeros((block_len, N), dtype=np.int64)
+        self.rew = np.zeros((block_len, N))
+        self.terminated = np.zeros((block_len, N), dtype=bool)
+        self.truncated = np.zeros((block_len, N), dtype=bool)
+
+    def grow(self):             #double the block, for n_episode collects that outrun it
+        old = self.feat, self.mask, self.topo, self.act, self.rew, self.terminated, self.truncated
+        self.alloc(self.block_len*2, self.feat.shape[2:], self.mask.shape[2], self.topo is not None)
+        for new, arr in zip((self.feat, self.mask, self.topo, self.act, self.rew, self.terminated, self.truncated), old):
+            if arr is not None:
+                new[:len(arr)] = arr
+
+    @staticmethod
+    def split_obs(obs):         #vector envs return dicts of stacked arrays or arrays of per-env dicts
+        if isinstance(obs, dict):
+            return obs["feat"], obs["mask"], obs.get("topo")
+        feat = np.stack([o["feat"] for o in obs])
+        mask = np.stack([o["mask"] for o in obs])
+        topo = np.array([o["topo"] for o in obs]) if "topo" in obs[0] else None
+        return feat, mask, topo
+
+    def write_obs(self, t, ids, obs):
+        feat, mask, topo = self.split_obs(obs)
+        self.feat[t, ids] = feat
+        self.mask[t, ids] = mask
+        if self.topo is not None:
+            self.topo[t, ids] = topo
+
+    def reset_stat(self):
+        self.collect_step, self.collect_episode, self.collect_time = 0, 0, 0.0
+
+    def reset_buffer(self, keep_statistics = False):
+        self.buffer = None
+
+    def reset_env(self, gym_reset_kwargs = None):
+        obs, _ = self.env.reset()
+        self.write_obs(0, np.arange(self.env_num), obs)
+        self._ep_rew[:] = 0
+        self._ep_len[:] = 0
+
+    def reset(self, reset_buffer = True, gym_reset_kwargs = None):
+        self.reset_env()
+        if reset_buffer:
+            self.reset_buffer()
+        self.reset_stat()
+
+    def archive_plans(self, env_ids, rews):        #offer finished episodes to the archive
+        states = self.env.get_env_attr("_laststate", env_ids)
+        graphs = self.env.get_env_attr("graphml_file", env_ids)
+        scenarios = self.env.get_env_attr("req_bits", env_ids)
+        for rew, state, graph, scenario in zip(rews, states, graphs, scenarios):
+            self.archive.add(rew, state["probe"], graph, scenario)
+            self.workloads.setdefault(PlanArchive.workload(graph, scenario), None)
+
+    def collect(self, n_step = None, n_episode = None, **kwargs):
+        """Run every env for ``ceil(n_step/N)`` steps, or until ``n_episode`` episodes finished."""
+        assert (n_step is None) != (n_episode is None), "specify exactly one of n_step and n_episode"
+        start_time = time.time()
+        N = self.env_num
+        steps = -(-n_step // N) if n_step else None
+        while steps and steps > self.block_len:
+            self.grow()
+        device = getattr(self.policy, "_device", "cpu")
+        ep_rews, ep_lens = [], []
+        t = 0
+        while (t < steps) if steps else (len(ep_rews) < n_episode):
+            if t == self.block_len:
+                self.grow()
+            obs = Batch(feat=torch.as_tensor(self.feat[t], device=device),
+                        mask=torch.as_tensor(self.mask[t], device=device))
+            if self.topo is not None:
+                obs.topo = torch.as_tensor(self.topo[t], device=device)
+            with torch.no_grad():
+                act = to_numpy(self.policy(Batch(obs=obs, info=Batch())).act)
+            self.act[t] = act
+
+            result = self.env.step(act)
+            if len(result) == 5:
+                obs_next, rew, terminated, truncated, _ = result
+            else:
+                obs_next, rew, terminated, _ = result
+                truncated = np.zeros(N, dtype=bool)
+            done = np.logical_or(terminated, truncated)
+            self.rew[t] = rew
+            self.terminated[t] = terminated
+            self.truncated[t] = truncated
+            self._ep_rew += rew
+            self._ep_len += 1
+            self.write_obs(t+1, np.arange(N), obs_next)
+
+            if done.any():
+                ids = np.where(done)[0]
+                self.archive_plans(ids, self._ep_rew[ids])
+                ep_rews.extend(self._ep_rew[ids])
+                ep_lens.extend(self._ep_len[ids])
+                self._ep_rew[ids] = 0
+                self._ep_len[ids] = 0
+                obs_reset, _ = self.env.reset(ids)
+                self.write_obs(t+1, ids, obs_reset)
+            t += 1
+
+        #hand the block over env-major and keep the current observations for the next call
+        def flat(arr):
+            return arr[:t].swapaxes(0, 1).reshape((N*t,) + arr.shape[2:])
+        obs = Batch(feat=flat(self.feat), mask=flat(self.mask))
+        if self.topo is not None:
+            obs.topo = flat(self.topo)
+        terminated, truncated = flat(self.terminated), flat(self.truncated)
+        self.buffer = RolloutBlock(Batch(
+            obs=obs, act=flat(self.act), rew=flat(self.rew),
+            terminated=terminated, truncated=truncated, done=terminated | truncated,
+        ), N)
+        self.feat[0] = self.feat[t]
+        self.mask[0] = self.mask[t]
+        if self.topo is not None:
+            self.topo[0] = self.topo[t]
+
+        step_count = N*t
+        self.collect_step += step_count
+        self.collect_episode += len(ep_rews)
+        self.collect_time += max(time.time() - start_time, 1e-9)
+        rews, lens = np.array(ep_rews), np.array(ep_lens, dtype=np.int64)
+        return {
+            "n/ep": len(rews),
+            "n/st": step_count,
+            "rews": rews,
+            "lens": lens,
+            "rew": rews.mean() if len(rews) else 0,
+            "len": lens.mean() if len(lens) else 0,
+            "rew_std": rews.std() if len(rews) else 0,
+            "len_std": lens.std() if len(lens) else 0,
+        }
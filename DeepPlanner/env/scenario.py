@@ -0,0 +1,14 @@
+import numpy as np
+
+def make_scenarios(edge_len, scenario_num, seed = 0, telemetry_type = 5):
+    """Seeded ``(S, E)`` bank of requirement bitmasks, 2..T items per edge as in get_port_req."""
+    rng = np.random.default_rng(seed)
+    items_num = rng.integers(2, telemetry_type+1, size=(scenario_num, edge_len))
+    rank = rng.random((scenario_num, edge_len, telemetry_type)).argsort(-1).argsort(-1)    #random order of the items
+    chosen = rank < items_num[..., None]
+    dtype = np.min_scalar_type((1 << telemetry_type) - 1)                                 #uint8 up to 8 types
+    return (chosen << np.arange(telemetry_type)).sum(-1).astype(dtype)
+
+def scenario_port_req(scenario, telemetry_type = 5):
+    """Turn one ``(E,)`` row of requirement masks into ``port_req`` lists of item ids."""
+    return [[t+1 for t in range(telemetry_type) if m >> t & 1] for m in scenario.tolist()]
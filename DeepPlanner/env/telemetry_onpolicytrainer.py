@@ -1,9 +1,14 @@
+import io
+import multiprocessing
+import queue
 import time
 from abc import ABC, abstractmethod
 from collections import defaultdict, deque
+from copy import copy, deepcopy
 from typing import Any, Callable, DefaultDict, Dict, Optional, Tuple, Union
 
 import numpy as np
+import torch
 import tqdm
 
 from tianshou.data import AsyncCollector, Collector, ReplayBuffer
@@ -19,6 +24,37 @@ from tianshou.utils import (
     tqdm_config,
 )
 
+from env.plan_archive import PlanArchive
+
+def cpu_policy(policy):
+    """Copy of ``policy`` with every tensor on the CPU, for the forked evaluation process."""
+    f = io.BytesIO()
+    torch.save(policy, f)
+    f.seek(0)
+    policy = torch.load(f, map_location="cpu", weights_only=False)
+    policy._device = "cpu"
+    for m in policy.modules():
+        graphs = getattr(m, "graphs", None)
+        if hasattr(graphs, "device"):       #GraphSet of a multi-topology model
+            graphs.device = "cpu"
+    return policy
+
+def eval_worker(policy, collector, episode_per_test, reward_metric, jobs, results):
+    """Evaluation process of an async TelemetryTrainer: test every snapshot it is sent."""
+    torch.set_num_threads(1)
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        epoch, env_step, state = job
+        policy.load_state_dict(state)
+        step, episode, collect_time = collector.collect_step, collector.collect_episode, collector.collect_time
+        result = test_episode(policy, collector, None, epoch, episode_per_test, None, env_step, reward_metric)
+        plans = collector.archive.best() if hasattr(collector, "archive") else []
+        workloads = list(getattr(collector, "workloads", ()))
+        stats = (collector.collect_step-step, collector.collect_episode-episode, collector.collect_time-collect_time)
+        results.put((epoch, env_step, result, plans, workloads, stats))
+
 class TelemetryTrainer(BaseTrainer):
     """Create an iterator wrapper for on-policy training procedure.
 
@@ -75,6 +111,13 @@ class TelemetryTrainer(BaseTrainer):
         Default to True.
     :param bool test_in_train: whether to test in the training phase. Default to
         True.
+    :param bool async_test: run the per-epoch tests in a forked evaluation process
+        on weight snapshots, so training goes on while they run; results, best
+        plans and ``save_best_fn`` calls (on the snapshot that scored) come back
+        in later epochs and are drained before :meth:`run` returns. ``test_fn``
+        is not called for these tests. Default to False.
+    :param int max_pending_tests: snapshots that may wait for evaluation before
+        the trainer blocks on the oldest one. Default to 2.
 
     .. note::
 
@@ -106,6 +149,8 @@ class TelemetryTrainer(BaseTrainer):
         verbose: bool = True,
         show_progress: bool = True,
         test_in_train: bool = True,
+        async_test: bool = False,
+        max_pending_tests: int = 2,
         **kwargs: Any,
     ):
         super().__init__(
@@ -135,28 +180,83 @@ class TelemetryTrainer(BaseTrainer):
         )
         
         self.best_probe_path = None     #record the optimal probe paths
+        #elite plans gathered by the collectors (path_Collector), saved after every test
+        self.archive = getattr(test_collector, "archive", getattr(train_collector, "archive", None))
+
+        #async evaluation: worker process, weight snapshots waiting for their result
+        self.async_test = async_test
+        self.max_pending_tests = max_pending_tests
+        self._eval_proc = None
+        self._pending = {}
+        self._snapshot_policy = None
+        self._test_stat = {}
+
+        #anytime training, set by run(): wall-clock deadline and improved-plan callback
+        self.deadline = None
+        self.on_improve = None
+        self._streamed_reward = {}      #workload -> reward of the last plan passed to on_improve
+
+    def out_of_time(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def eval_workloads(self):
+        """Workloads (graph, requirement scenario) the test collector evaluated on, None for all before any test."""
+        if self.test_collector is None or not hasattr(self.test_collector, "workloads"):
+            return None
+        return list(self.test_collector.workloads) or None
+
+    def stream_best(self) -> None:
+        """Pass the best plan of every evaluation workload to ``on_improve`` when it got better."""
+        if self.on_improve is None or self.archive is None:
+            return
+        for elite in self.archive.elites(self.eval_workloads(), 1):
+            if not elite["plans"]:
+                continue
+            plan = elite["plans"][0]
+            workload = PlanArchive.workload(plan["graph"], plan["scenario"])
+            if workload not in self._streamed_reward or plan["reward"] > self._streamed_reward[workload]:
+                self._streamed_reward[workload] = plan["reward"]
+                self.on_improve(dict(plan, epoch=self.epoch, env_step=self.env_step, elapsed=time.time()-self.start_time))
+
+    def train_step(self) -> Tuple[Dict[str, Any], Dict[str, Any], bool]:
+        """Perform one training step, the epoch ends early once the time budget is spent."""
+        data, result, stop_fn_flag = super().train_step()
+        self.stream_best()
+        return data, result, stop_fn_flag or self.out_of_time()
 
     def test_step(self) -> Tuple[Dict[str, Any], bool]:
         """Perform one testing step."""
         assert self.episode_per_test is not None
         assert self.test_collector is not None
+        if self.async_test:
+            self.submit_test()
+            test_stat, stop_fn_flag = self.poll_tests(block=len(self._pending) > self.max_pending_tests)
+        else:
+            test_result = test_episode(
+                self.policy, self.test_collector, self.test_fn, self.epoch,
+                self.episode_per_test, self.logger, self.env_step, self.reward_metric
+            )
+            test_stat, stop_fn_flag = self.report_test(self.epoch, test_result, self.policy)
+        self.stream_best()
+        return test_stat, stop_fn_flag or self.out_of_time()
+
+    def report_test(self, epoch, test_result, policy) -> Tuple[Dict[str, Any], bool]:
+        """Track the best result of a finished test of the weights of ``epoch``."""
         stop_fn_flag = False
-        test_result = test_episode(
-            self.policy, self.test_collector, self.test_fn, self.epoch,
-            self.episode_per_test, self.logger, self.env_step, self.reward_metric
-        )
         rew, rew_std = test_result["rew"], test_result["rew_std"]
         probe_path = test_result["probe_path"]
         if self.best_epoch < 0 or self.best_reward < rew:
-            self.best_epoch = self.epoch
+            self.best_epoch = epoch
             self.best_reward = float(rew)
             self.best_reward_std = rew_std
             self.best_probe_path = probe_path
             if self.save_best_fn:
-                self.save_best_fn(self.policy)
+                self.save_best_fn(policy)
+        if self.archive is not None:
+            self.archive.save()
         if self.verbose:
             print(
-                f"Epoch #{self.epoch}: test_reward: {rew:.6f} ± {rew_std:.6f},"
+                f"Epoch #{epoch}: test_reward: {rew:.6f} ± {rew_std:.6f},"
                 f" best_reward: {self.best_reward:.6f} ± "
                 f"{self.best_reward_std:.6f} in #{self.best_epoch}",
                 flush=True
@@ -176,6 +276,64 @@ class TelemetryTrainer(BaseTrainer):
 
         return test_stat, stop_fn_flag
 
+    def start_eval_worker(self) -> None:
+        #forked, so the worker starts from copies of the test collector and of a CPU
+        #copy of the policy; nothing on a CUDA device is touched in the child
+        policy = cpu_policy(self.policy)
+        collector = copy(self.test_collector)
+        collector.policy = policy
+        ctx = multiprocessing.get_context("fork")
+        self._jobs, self._results = ctx.Queue(), ctx.Queue()
+        self._eval_proc = ctx.Process(
+            target=eval_worker, daemon=True,
+            args=(policy, collector, self.episode_per_test, self.reward_metric, self._jobs, self._results),
+        )
+        self._eval_proc.start()
+
+    def stop_eval_worker(self, wait = True) -> None:
+        if self._eval_proc is not None:
+            if wait:                #after the snapshots still queued
+                self._jobs.put(None)
+            else:
+                self._eval_proc.terminate()
+            self._eval_proc.join()
+            self._eval_proc = None
+
+    def submit_test(self) -> None:
+        """Send a snapshot of the current weights to the evaluation process."""
+        if self._eval_proc is None:
+            self.start_eval_worker()
+        state = {k: v.detach().cpu().clone() for k, v in self.policy.state_dict().items()}
+        self._pending[self.epoch] = state
+        self._jobs.put((self.epoch, self.env_step, state))
+
+    def poll_tests(self, block = False, drain = False) -> Tuple[Dict[str, Any], bool]:
+        """Report the test results that came back, waiting for one if ``block``, for all if ``drain``."""
+        stop_fn_flag = False
+        while self._pending:
+            try:
+                epoch, env_step, result, plans, workloads, stats = self._results.get(block=block or drain)
+            except queue.Empty:
+                break
+            block = False
+            state = self._pending.pop(epoch)
+            if self.save_best_fn:       #hand save_best_fn the weights that were tested
+                if self._snapshot_policy is None:
+                    self._snapshot_policy = deepcopy(self.policy)
+                self._snapshot_policy.load_state_dict(state)
+            self.test_collector.collect_step += stats[0]
+            self.test_collector.collect_episode += stats[1]
+            self.test_collector.collect_time += stats[2]
+            for plan in plans:
+                if self.archive is not None:
+                    self.archive.add(plan["reward"], plan["probe"], plan["graph"], plan["scenario"])
+            for workload in workloads:
+                self.test_collector.workloads.setdefault(workload, None)
+            self.logger.log_test_data(result, env_step)
+            self._test_stat, stop = self.report_test(epoch, result, self._snapshot_policy)
+            stop_fn_flag = stop_fn_flag or stop
+        return self._test_stat, stop_fn_flag
+
     def policy_update_fn(
         self, data: Dict[str, Any], result: Optional[Dict[str, Any]] = None
     ) -> None:
@@ -192,22 +350,34 @@ class TelemetryTrainer(BaseTrainer):
         self.gradient_step += step
         self.log_update_data(data, losses)
         
-    def run(self) -> Dict[str, Union[float, str]]:
+    def run(self, time_budget = None, on_improve = None) -> Dict[str, Union[float, str]]:
         """Consume iterator.
 
         See itertools - recipes. Use functions that consume iterators at C speed
         (feed the entire iterator into a zero-length deque).
         """
+        self.deadline = None if time_budget is None else time.time() + time_budget
+        self.on_improve = on_improve
+        self._streamed_reward = {}
         try:
             self.is_run = True
             deque(self, maxlen=0)  # feed the entire iterator into a zero-length deque
+            if self.async_test:     #results of the last epochs are still out
+                self.poll_tests(drain=self.deadline is None)
             info = gather_info(
                 self.start_time, self.train_collector, self.test_collector,
                 self.best_reward, self.best_reward_std
             )
         finally:
             self.is_run = False
+            self.stop_eval_worker(wait=self.deadline is None)
+        self.stream_best()
 
+        if self.archive is not None and len(self.archive):     #best plans of train and test episodes per evaluation workload
+            self.archive.save()
+            info["elite_plans"] = self.archive.elites(self.eval_workloads())
+            if self.best_probe_path is None:        #out of time before a test reported: best archived plan so far
+                return info, self.archive.best(1)[0]["probe"]
         return info, self.best_probe_path
 
 
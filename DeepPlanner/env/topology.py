@@ -0,0 +1,130 @@
+import hashlib
+import os
+import zipfile
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+import networkx as nx
+
+TOPO_VERSION = 3            #bump when the compiled layout changes
+_loaded = {}                #digest -> compiled topology of this process
+_attached = []              #shared memory blocks mapped by this process
+
+#picklable handle to a compiled topology placed in shared memory
+SharedTopology = namedtuple("SharedTopology", ["name", "layout"])
+
+def default_cache_dir():        #per-user cache, outside the (possibly read-only) source tree
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "deep-int", "topo")
+
+def topology_digest(graphml_file):
+    h = hashlib.sha1(b"topo-v%d" % TOPO_VERSION)
+    with open(graphml_file, "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+def compile_topology(graphml_file):
+    """Turn a ``.graphml`` topology into the flat int64 arrays used by the envs."""
+    G = nx.read_graphml(graphml_file)
+    nodes_num = G.number_of_nodes()
+    edge_index = np.array([(int(u), int(v)) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+    edge_len = len(edge_index)
+    port_num = edge_len*2
+
+    flat = edge_index.reshape(-1)                   #u0, v0, u1, v1, ...
+    flat_port = np.empty(port_num, dtype=np.int64)
+    flat_port[np.argsort(flat, kind="stable")] = np.arange(port_num)
+    edge_port_index = flat_port.reshape(-1, 2)      #(E, 2) ports of each edge
+
+    port_edge = np.empty(port_num, dtype=np.int64)
+    port_edge[flat_port] = np.repeat(np.arange(edge_len), 2)
+    port_node = np.empty(port_num, dtype=np.int64)
+    port_node[flat_port] = flat
+    port_peer = np.empty(port_num, dtype=np.int64)
+    port_peer[edge_port_index[:, 0]] = edge_port_index[:, 1]
+    port_peer[edge_port_index[:, 1]] = edge_port_index[:, 0]
+
+    node_port_ptr = np.zeros(nodes_num+1, dtype=np.int64)     #CSR row pointer, also the node->port slice
+    node_port_ptr[1:] = np.cumsum(np.bincount(flat, minlength=nodes_num))
+    adj_index = port_node[port_peer]                            #CSR column index: neighbour behind each port
+
+    #hop index: hop u->v is keyed u*V+v, sorted for np.searchsorted; hop_port holds
+    #(port at u, port at v)
+    hop_key = np.concatenate([edge_index[:, 0]*nodes_num+edge_index[:, 1], edge_index[:, 1]*nodes_num+edge_index[:, 0]])
+    order = np.argsort(hop_key, kind="stable")
+    hop_key = hop_key[order]
+    hop_port = np.concatenate([edge_port_index, edge_port_index[:, ::-1]])[order]
+
+    return dict(
+        nodes_num=np.array(nodes_num, dtype=np.int64),
+        edge_index=edge_index,
+        edge_port_index=edge_port_index,
+        port_edge=port_edge,
+        port_node=port_node,
+        port_peer=port_peer,
+        node_port_ptr=node_port_ptr,
+        adj_index=adj_index,
+        hop_key=hop_key,
+        hop_port=hop_port,
+    )
+
+def load_topology(graphml_file, cache_dir = None):
+    """Compiled topology of ``graphml_file``, cached per process and as ``.npz`` in ``cache_dir``."""
+    digest = topology_digest(graphml_file)
+    if digest in _loaded:
+        return _loaded[digest]
+
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    name = os.path.splitext(os.path.basename(graphml_file))[0]
+    path = os.path.join(cache_dir, "%s-%s.npz" % (name, digest[:16]))
+    try:
+        with np.load(path) as f:
+            topo = {k: f[k] for k in f.files}
+    except (OSError, ValueError, zipfile.BadZipFile):
+        topo = compile_topology(graphml_file)
+        try:                                            #write atomically, workers may race here
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = "%s.%d.tmp" % (path, os.getpid())
+            with open(tmp, "wb") as f:
+                np.savez(f, **topo)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    for v in topo.values():
+        v.setflags(write=False)
+    _loaded[digest] = topo
+    return topo
+
+def share_topology(topo):
+    """Copy a compiled topology into one shared memory block, returns it and a picklable handle."""
+    layout, offset = [], 0
+    for k, v in topo.items():
+        layout.append((k, v.dtype.str, v.shape, offset))
+        offset += v.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (k, dtype, shape, offset), v in zip(layout, topo.values()):
+        np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)[...] = v
+    return shm, SharedTopology(shm.name, layout)
+
+def release_topology(shm):
+    """Close and unlink a block created by :func:`share_topology`."""
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+def attach_topology(handle):
+    """Map the arrays behind a :class:`SharedTopology` handle without copying."""
+    if handle.name in _loaded:
+        return _loaded[handle.name]
+    shm = shared_memory.SharedMemory(name=handle.name)
+    topo = {}
+    for k, dtype, shape, offset in handle.layout:
+        topo[k] = np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+        topo[k].setflags(write=False)
+    _attached.append(shm)       #keep the mapping alive for the arrays
+    _loaded[handle.name] = topo
+    return topo
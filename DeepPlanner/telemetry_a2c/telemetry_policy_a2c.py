@@ -12,7 +12,10 @@ from tianshou.utils.net.common import ActorCritic
 from torch.distributions.categorical import Categorical
 from torch.optim.lr_scheduler import CosineAnnealingLR
 
-class TelemetryA2C(A2CPolicy):
+from env.gcnac import GCNActorCritic
+from env.policy_mixin import TelemetryPolicyMixin
+
+class TelemetryA2C(TelemetryPolicyMixin, A2CPolicy):
     def __init__(
         self,
         actor: torch.nn.Module,
@@ -36,7 +39,7 @@ class TelemetryA2C(A2CPolicy):
         self._weight_ent = ent_coef
         self._grad_norm = max_grad_norm
         self._batch = max_batchsize
-        self._actor_critic = ActorCritic(self.actor, self.critic)
+        self._actor_critic = GCNActorCritic(self.actor, self.critic)      #logits and value from one GCN pass
 
         self._actor = actor
 
@@ -53,18 +56,14 @@ class TelemetryA2C(A2CPolicy):
             model: str = "actor"
     ) -> Batch:
         # Convert batch observations to PyTorch tensors
-        obs_ = to_torch(batch[input], device=self._device, dtype=torch.float32)
-        mask = to_torch(batch['info'].mask, device=self._device)
+        obs_ = to_torch(batch[input].feat, device=self._device, dtype=torch.float32)
+        mask = to_torch(batch[input].mask, device=self._device)
 
         model_ = self._actor
 
-        logits = model_.get_logits(obs_, self.edge_index)
+        logits = model_.get_logits(obs_, self.graph_of(batch[input]))
         pi = Categorical(logits=logits)
-        mask = torch.squeeze(mask)
-        logits_delta = torch.zeros(mask.size()).to(mask.device)
-        logits_delta[mask == 0] = float("-Inf")
-        logits_ = logits + logits_delta
-        pi_mask = Categorical(logits = logits_)
+        pi_mask = Categorical(logits=logits.masked_fill(~mask, float("-inf")))     #infeasible actions are never sampled
         
         a = pi_mask.sample()
         
@@ -75,23 +74,23 @@ class TelemetryA2C(A2CPolicy):
     def process_fn(
         self, batch: Batch, buffer: ReplayBuffer, indices: np.ndarray
     ) -> Batch:
+        # rollout tensors are materialized on the device once and only sliced afterwards
+        batch.obs = self.obs_to_torch(batch.obs)
+        batch.act = to_torch(batch.act, device=self._device, dtype=torch.long)
         batch = self._compute_returns(batch, buffer, indices)
-        batch.act = to_torch_as(batch.act, batch.v_s)
         return batch
 
     def _compute_returns(
         self, batch: Batch, buffer: ReplayBuffer, indices: np.ndarray
     ) -> Batch:
-        v_s, v_s_ = [], []
+        v_s = []
         with torch.no_grad():
             for minibatch in batch.split(self._batch, shuffle=False, merge_last=True):
-                obs_tem = to_torch(minibatch.obs, device=self._device, dtype=torch.float32) 
-                obs_next_tem = to_torch(minibatch.obs, device=self._device, dtype=torch.float32)
-                v_s.append(self.critic(obs_tem, self.edge_index))
-                v_s_.append(self.critic(obs_next_tem, self.edge_index))
+                obs_tem = to_torch(minibatch.obs.feat, device=self._device, dtype=torch.float32) 
+                v_s.append(self.critic(obs_tem, self.graph_of(minibatch.obs)))
         batch.v_s = torch.cat(v_s, dim=0).flatten()  # old value
         v_s = batch.v_s.cpu().numpy()
-        v_s_ = torch.cat(v_s_, dim=0).flatten().cpu().numpy()
+        v_s_ = v_s.copy()       #next values have always been evaluated on minibatch.obs
         # when normalizing values, we do not minus self.ret_rms.mean to be numerically
         # consistent with OPENAI baselines' value normalization pipeline. Emperical
         # study also shows that "minus mean" will harm performances a tiny little bit
@@ -122,16 +121,20 @@ class TelemetryA2C(A2CPolicy):
         self, batch: Batch, batch_size: int, repeat: int, **kwargs: Any
     ) -> Dict[str, List[float]]:
         losses, actor_losses, vf_losses, ent_losses = [], [], [], []
+        data = Batch(obs=batch.obs, act=batch.act, returns=batch.returns, adv=batch.adv)
         for _ in range(repeat):
-            for minibatch in batch.split(batch_size, merge_last=True):
+            for idx in self.minibatch_indices(len(data), batch_size):
+                minibatch = data[idx]
+                # actor and critic from one pass of the shared GCN
+                obs_tem = to_torch(minibatch.obs.feat, device=self._device, dtype=torch.float32)
+                logits, value = self._actor_critic(obs_tem, self.graph_of(minibatch.obs))
+                value = value.flatten()
                 # calculate loss for actor
-                dist = self(minibatch).dist
+                dist = Categorical(logits=logits)
                 log_prob = dist.log_prob(minibatch.act)
                 log_prob = log_prob.reshape(len(minibatch.adv), -1).transpose(0, 1)
                 actor_loss = -(log_prob * minibatch.adv).mean()
                 # calculate loss for critic
-                obs_tem = to_torch(minibatch.obs, device=self._device, dtype=torch.float32)
-                value = self.critic(obs_tem, self.edge_index).flatten()
                 vf_loss = F.mse_loss(minibatch.returns, value)
                 # calculate regularization and overall loss
                 ent_loss = dist.entropy().mean()
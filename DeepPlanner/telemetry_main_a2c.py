@@ -5,7 +5,7 @@ import gymnasium as gym
 import torch
 import torch.nn as nn
 
-from tianshou.data import Collector, VectorReplayBuffer
+from tianshou.data import Collector
 from tianshou.env import DummyVectorEnv
 from tianshou.policy import PPOPolicy
 from tianshou.trainer import OnpolicyTrainer
@@ -15,7 +15,15 @@ from torch.utils.tensorboard import SummaryWriter
 from tianshou.utils import TensorboardLogger
 
 from env.network_env import make_telemetry_env
-from telemetry_a2c.gcnac import GCNCategoricalActor, GCNCritic, GCN
+from env.multi_topo import make_multi_topology_env
+from env.topology import load_topology
+from env.replay_buffer import TelemetryVectorReplayBuffer
+from env.planner import anytime_plan, beam_search_plan
+from env.plan_archive import PlanArchive
+from env.rollout import RolloutCollector
+from env.pretrain import baseline_plans, behavior_clone, make_demos
+from env.scenario import make_scenarios
+from env.gcnac import GCNActorCritic, GCNCategoricalActor, GCNCritic, GCN, GCNPortActor, GCNPooledCritic, GraphSet, NodeGCN
 from env.path_collector import path_Collector
 from telemetry_a2c.telemetry_policy_a2c import TelemetryA2C
 from env.telemetry_onpolicytrainer import TelemetryTrainer
@@ -39,9 +47,29 @@ def get_args():
     parser.add_argument('--lr-maxt', type=int, default=400)
     
     parser.add_argument('--buffer-size', type=int, default=5000)
+    parser.add_argument('--training-num', type=int, default=1)
+    parser.add_argument('--env-backend', type=str, default='dummy', choices=['dummy', 'subproc', 'shmem', 'batched'])
+    parser.add_argument('--scenario-num', type=int, default=0)        #size of the training requirement bank, 0 keeps one fixed workload per env
+    parser.add_argument('--test-scenario-num', type=int, default=0)   #size of the evaluation requirement bank
+    parser.add_argument('--local-actions', action='store_true')       #actions index the ports of the current node
+    parser.add_argument('--policy', type=str, default='mlp', choices=['mlp', 'port'])      #port: per-port head that runs on any topology
+    parser.add_argument('--topologies', type=str, nargs='+', default=['topo/Nsfnet.graphml'])     #graphs trained on together by the port policy
+    parser.add_argument('--collector', type=str, default='path', choices=['path', 'rollout'])     #rollout: preallocated lean train collector
+    parser.add_argument('--async-test', action='store_true')          #evaluate weight snapshots in a separate process while training goes on
+    parser.add_argument('--archive-size', type=int, default=10)       #best distinct plans kept per workload (graph and requirements) from train and test episodes
+    parser.add_argument('--archive-path', type=str, default=None)     #elite plan archive resumed from and saved to across runs, default elite_plans.json in the run's log dir
+    parser.add_argument('--time-budget', type=float, default=None)   #seconds of training, the best plan so far is returned when they run out
+    parser.add_argument('--plan-budget', type=float, default=0)      #seconds of anytime beam search decoding after training, replaces --beam-width
+    parser.add_argument('--beam-width', type=int, default=0)         #decode a plan of the first test scenario after training, 1 is greedy
+    parser.add_argument('--bc-epochs', type=int, default=0)           #behavior cloning epochs on the baseline planners' plans before RL, 0 starts from scratch
+    parser.add_argument('--bc-lr', type=float, default=1e-3)
+    parser.add_argument('--bc-baselines', type=str, nargs='+', default=['dfs', 'eulerun', 'euler', 'intbalance'])
+    parser.add_argument('--bc-repeats', type=int, default=4)          #runs of every baseline, eulerun and intbalance are randomized
     parser.add_argument('--seed', type=int, default=321)
     
     args = parser.parse_known_args()[0]
+    if args.policy == 'port' and args.local_actions:
+        parser.error("--local-actions is not supported by --policy port, whose head scores global ports")
     return args
 
 args=get_args()
@@ -49,7 +77,13 @@ args=get_args()
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
 # environments
-env, train_envs, test_envs = make_telemetry_env(1, 1)
+if args.policy == "port":      #one model for every graph in args.topologies
+    env, train_envs, test_envs = make_multi_topology_env(args.topologies, args.training_num, 1, backend=args.env_backend,
+        scenario_num=args.scenario_num, test_scenario_num=args.test_scenario_num, scenario_seed=args.seed)
+else:
+    env, train_envs, test_envs = make_telemetry_env(args.training_num, 1, backend=args.env_backend,
+        scenario_num=args.scenario_num, test_scenario_num=args.test_scenario_num, scenario_seed=args.seed,
+        local_actions=args.local_actions)
 
 seed = args.seed
 
@@ -57,38 +91,44 @@ if torch.cuda.is_available():
     torch.cuda.manual_seed(seed)
     torch.cuda.manual_seed_all(seed)
 
-node_num = env.observation_space.shape[0]
-feature_num = env.observation_space.shape[1]
+node_num = env.observation_space["feat"].shape[0]
+feature_num = env.observation_space["feat"].shape[1]
 hidden_sizes = (args.hidden, args.hidden) #MLP
 activation = nn.ReLU
 
-state_shape = env.observation_space.shape
+state_shape = env.observation_space["feat"].shape
 action_shape = env.action_space.n
 
 # create gcn
-out_feature_num = 1 
-gcn = GCN(feature_num, out_feature_num)
+if args.policy == "port":
+    graphs = GraphSet([load_topology(g) for g in args.topologies], device)
+    gcn = NodeGCN(feature_num, args.hidden)
+    actor = GCNPortActor(gcn, args.hidden, graphs, hidden_sizes, activation).to(device)
+    critic = GCNPooledCritic(gcn, args.hidden, graphs, hidden_sizes, activation).to(device)
+else:
+    out_feature_num = 1 
+    gcn = GCN(feature_num, out_feature_num)
     
-# Actor is a Diffusion model
-actor = GCNCategoricalActor(
-    feature_num=out_feature_num,
-    node_num=node_num,
-    gcn=gcn,
-    hidden_sizes=hidden_sizes,
-    act_num=action_shape,
-    activation=activation,
-).to(device)
-
-# Create critic
-critic = GCNCritic(
-    feature_num=out_feature_num,
-    node_num=node_num,
-    gcn=gcn,
-    hidden_sizes=hidden_sizes,
-    activation=activation
-).to(device)
-
-actor_critic = ActorCritic(actor, critic)
+    # Actor is a Diffusion model
+    actor = GCNCategoricalActor(
+        feature_num=out_feature_num,
+        node_num=node_num,
+        gcn=gcn,
+        hidden_sizes=hidden_sizes,
+        act_num=action_shape,
+        activation=activation,
+    ).to(device)
+
+    # Create critic
+    critic = GCNCritic(
+        feature_num=out_feature_num,
+        node_num=node_num,
+        gcn=gcn,
+        hidden_sizes=hidden_sizes,
+        activation=activation
+    ).to(device)
+
+actor_critic = GCNActorCritic(actor, critic)
 optim = torch.optim.AdamW(actor_critic.parameters(), lr=args.lr, weight_decay=args.wd)
 
 # Setup logging
@@ -109,9 +149,32 @@ policy = TelemetryA2C(
     dist_fn=dist,
 )
 
-# collector
-train_collector = Collector(policy, train_envs, VectorReplayBuffer(args.buffer_size, len(train_envs)))
-test_collector = path_Collector(policy, test_envs)
+# warm start: imitate the best baseline plan of every training scenario
+if args.bc_epochs:
+    assert args.policy == "mlp" and not args.local_actions, "behavior cloning needs the global-action GCN actor"
+    if args.scenario_num:       #the training bank of make_telemetry_env
+        scenarios = make_scenarios(env.edge_len, args.scenario_num, args.seed, env.telemetry_type)
+    else:
+        scenarios = train_envs.get_env_attr("req_bits")
+    demos, rewards = make_demos(env, baseline_plans(env, args.bc_baselines, args.bc_repeats), scenarios, policy._gamma)
+    bc = behavior_clone(actor, demos, env.edge_index.to(device), args.bc_epochs, args.batch_size, args.bc_lr, critic)
+    for i, (loss, acc) in enumerate(zip(bc["loss"], bc["acc"])):
+        writer.add_scalar("bc/loss", loss, i)
+        writer.add_scalar("bc/acc", acc, i)
+    best_rew = [max(r for _, r in rw) for rw in rewards]
+    print("Behavior cloning: %d demo steps, best baseline reward %.4f, loss %.4f, accuracy %.3f" % (
+        len(demos["act"]), sum(best_rew)/len(best_rew), bc["loss"][-1], bc["acc"][-1]))
+
+# collectors, both feed one archive of elite plans, resumed from --archive-path if it exists
+archive = PlanArchive(args.archive_size, args.archive_path or os.path.join(log_path, 'elite_plans.json'))
+if args.collector == "rollout":
+    train_collector = RolloutCollector(policy, train_envs, archive=archive)
+else:
+    train_collector = path_Collector(policy, train_envs, TelemetryVectorReplayBuffer(args.buffer_size, len(train_envs)), archive=archive)
+test_collector = path_Collector(policy, test_envs, archive=archive)
+
+def show_plan(plan):        #improvements streamed by the anytime trainer and planner
+    print("Improved plan: reward %.4f" % plan["reward"], flush=True)
 
 # trainer
 result, best = TelemetryTrainer(
@@ -126,11 +189,21 @@ result, best = TelemetryTrainer(
     step_per_collect=args.step_per_collect,
     episode_per_collect=args.episode_per_collect,
     logger = logger,
-).run()
+    async_test = args.async_test,
+).run(time_budget=args.time_budget, on_improve=show_plan)
 print(result)
 print(best)
 writer.add_text("best_probe_path", str(best)+','+result['best_result'])
 print("-------------------------------------------------------")
+if args.plan_budget or args.beam_width:     #deterministic plan with the trained actor
+    scenario = test_envs.get_env_attr("req_bits", 0)[0]
+    if args.plan_budget:
+        plan = anytime_plan(actor, env, args.plan_budget, scenario, on_improve=show_plan)
+    else:
+        plan = dict(beam_search_plan(actor, env, args.beam_width, scenario), beam_width=args.beam_width)
+    print("Beam-%d reward: %.4f" % (plan["beam_width"], plan["reward"]))
+    print(plan["probe"])
+    writer.add_text("beam_probe_path", str(plan["probe"])+','+str(plan["reward"]))
 # policy.eval()
 
 # probe_path_collector = path_Collector(policy, test_envs)
@@ -13,7 +13,9 @@ from tianshou.utils.net.common import ActorCritic
 from torch.distributions.categorical import Categorical
 from torch.optim.lr_scheduler import CosineAnnealingLR
 
-class TelemetryPG(BasePolicy):
+from env.policy_mixin import TelemetryPolicyMixin
+
+class TelemetryPG(TelemetryPolicyMixin, BasePolicy):
     def __init__(
         self,
         model: torch.nn.Module,
@@ -69,6 +71,10 @@ class TelemetryPG(BasePolicy):
             self.ret_rms.update(unnormalized_returns)
         else:
             batch.returns = unnormalized_returns
+        # rollout tensors are materialized on the device once and only sliced afterwards
+        batch.obs = self.obs_to_torch(batch.obs)
+        batch.act = to_torch(batch.act, device=self._device, dtype=torch.long)
+        batch.returns = to_torch(batch.returns, device=self._device, dtype=torch.float32)
         return batch
 
     def forward(
@@ -91,16 +97,12 @@ class TelemetryPG(BasePolicy):
             Please refer to :meth:`~tianshou.policy.BasePolicy.forward` for
             more detailed explanation.
         """
-        obs_tem = to_torch(batch.obs, device=self._device, dtype=torch.float32) 
-        logits, hidden = self.actor.get_logits(obs_tem, self.edge_index), None
-        mask = to_torch(batch['info'].mask, device=self._device)
+        obs_tem = to_torch(batch.obs.feat, device=self._device, dtype=torch.float32) 
+        logits, hidden = self.actor.get_logits(obs_tem, self.graph_of(batch.obs)), None
+        mask = to_torch(batch.obs.mask, device=self._device)
         
         pi = Categorical(logits=logits)
-        mask = torch.squeeze(mask)
-        logits_delta = torch.zeros(mask.size()).to(mask.device)
-        logits_delta[mask == 0] = float("-Inf")
-        logits_ = logits + logits_delta
-        pi_mask = Categorical(logits = logits_)
+        pi_mask = Categorical(logits=logits.masked_fill(~mask, float("-inf")))     #infeasible actions are never sampled
         
         a = pi_mask.sample()
         
@@ -121,8 +123,10 @@ class TelemetryPG(BasePolicy):
         self, batch: Batch, batch_size: int, repeat: int, **kwargs: Any
     ) -> Dict[str, List[float]]:
         losses = []
+        data = Batch(obs=batch.obs, act=batch.act, returns=batch.returns)
         for _ in range(repeat):
-            for minibatch in batch.split(batch_size, merge_last=True):
+            for idx in self.minibatch_indices(len(data), batch_size):
+                minibatch = data[idx]
                 self.optim.zero_grad()
                 result = self(minibatch)
                 dist = result.dist
@@ -11,7 +11,10 @@ from tianshou.utils.net.common import ActorCritic
 from torch.distributions.categorical import Categorical
 from torch.optim.lr_scheduler import CosineAnnealingLR
 
-class TelemetryPPO(PPOPolicy):
+from env.gcnac import GCNActorCritic
+from env.policy_mixin import TelemetryPolicyMixin
+
+class TelemetryPPO(TelemetryPolicyMixin, PPOPolicy):
     def __init__(
         self,
         actor: torch.nn.Module,
@@ -37,7 +40,7 @@ class TelemetryPPO(PPOPolicy):
         self._value_clip = value_clip
         self._norm_adv = advantage_normalization
         self._recompute_adv = recompute_advantage
-        self._actor_critic: ActorCritic
+        self._actor_critic = GCNActorCritic(actor, critic)     #logits and value from one GCN pass
 
         self._actor = actor
 
@@ -57,18 +60,14 @@ class TelemetryPPO(PPOPolicy):
             model: str = "actor"
     ) -> Batch:
         # Convert batch observations to PyTorch tensors
-        obs_ = to_torch(batch[input], device=self._device, dtype=torch.float32)
-        mask = to_torch(batch['info'].mask, device=self._device)
+        obs_ = to_torch(batch[input].feat, device=self._device, dtype=torch.float32)
+        mask = to_torch(batch[input].mask, device=self._device)
 
         model_ = self._actor
         
-        logits = model_.get_logits(obs_, self.edge_index)
+        logits = model_.get_logits(obs_, self.graph_of(batch[input]))
         pi = Categorical(logits=logits)
-        mask = torch.squeeze(mask)
-        logits_delta = torch.zeros(mask.size()).to(mask.device)
-        logits_delta[mask == 0] = float("-Inf")
-        logits_ = logits + logits_delta
-        pi_mask = Categorical(logits = logits_)
+        pi_mask = Categorical(logits=logits.masked_fill(~mask, float("-inf")))     #infeasible actions are never sampled
         
         a = pi_mask.sample()
         
@@ -83,25 +82,28 @@ class TelemetryPPO(PPOPolicy):
         if self._recompute_adv:
             # buffer input `buffer` and `indices` to be used in `learn()`.
             self._buffer, self._indices = buffer, indices
-        batch = self._compute_returns(batch, buffer, indices)
-        batch.act = to_torch_as(batch.act, batch.v_s)
-        with torch.no_grad():
-            batch.logp_old = self(batch).dist.log_prob(batch.act)
+        # rollout tensors are materialized on the device once and only sliced afterwards
+        batch.obs = self.obs_to_torch(batch.obs)
+        batch.act = to_torch(batch.act, device=self._device, dtype=torch.long)
+        batch = self._compute_returns(batch, buffer, indices, with_logp=True)
         return batch
     
     def _compute_returns(
-        self, batch: Batch, buffer: ReplayBuffer, indices: np.ndarray
+        self, batch: Batch, buffer: ReplayBuffer, indices: np.ndarray, with_logp: bool = False
     ) -> Batch:
-        v_s, v_s_ = [], []
+        v_s, logp = [], []
         with torch.no_grad():
             for minibatch in batch.split(self._batch, shuffle=False, merge_last=True):
-                obs_tem = to_torch(minibatch.obs, device=self._device, dtype=torch.float32)
-                obs_next_tem = to_torch(minibatch.obs, device=self._device, dtype=torch.float32)
-                v_s.append(self.critic(obs_tem, self.edge_index))
-                v_s_.append(self.critic(obs_next_tem, self.edge_index))
+                obs_tem = to_torch(minibatch.obs.feat, device=self._device, dtype=torch.float32)
+                logits, value = self._actor_critic(obs_tem, self.graph_of(minibatch.obs))
+                v_s.append(value)
+                if with_logp:       #log-probabilities of the collected actions under the current policy
+                    logp.append(Categorical(logits=logits).log_prob(minibatch.act))
         batch.v_s = torch.cat(v_s, dim=0).flatten()  # old value
+        if with_logp:
+            batch.logp_old = torch.cat(logp, dim=0)
         v_s = batch.v_s.cpu().numpy()
-        v_s_ = torch.cat(v_s_, dim=0).flatten().cpu().numpy()
+        v_s_ = v_s.copy()       #next values have always been evaluated on minibatch.obs
         # when normalizing values, we do not minus self.ret_rms.mean to be numerically
         # consistent with OPENAI baselines' value normalization pipeline. Emperical
         # study also shows that "minus mean" will harm performances a tiny little bit
@@ -135,9 +137,16 @@ class TelemetryPPO(PPOPolicy):
             for step in range(repeat):
                 if self._recompute_adv and step > 0:
                     batch = self._compute_returns(batch, self._buffer, self._indices)
-                for minibatch in batch.split(batch_size, merge_last=True):
+                data = Batch(obs=batch.obs, act=batch.act, logp_old=batch.logp_old,
+                             v_s=batch.v_s, returns=batch.returns, adv=batch.adv)
+                for idx in self.minibatch_indices(len(data), batch_size):
+                    minibatch = data[idx]
+                    # actor and critic from one pass of the shared GCN
+                    obs_tem = to_torch(minibatch.obs.feat, device=self._device, dtype=torch.float32)
+                    logits, value = self._actor_critic(obs_tem, self.graph_of(minibatch.obs))
+                    value = value.flatten()
                     # calculate loss for actor
-                    dist = self(minibatch).dist
+                    dist = Categorical(logits=logits)
                     if self._norm_adv:
                         mean, std = minibatch.adv.mean(), minibatch.adv.std()
                         minibatch.adv = (minibatch.adv -
@@ -155,8 +164,6 @@ class TelemetryPPO(PPOPolicy):
                     else:
                         clip_loss = -torch.min(surr1, surr2).mean()
                     # calculate loss for critic
-                    obs_tem = to_torch(minibatch.obs, device=self._device, dtype=torch.float32)
-                    value = self.critic(obs_tem, self.edge_index).flatten()
                     if self._value_clip:
                         v_clip = minibatch.v_s + \
                             (value - minibatch.v_s).clamp(-self._eps_clip, self._eps_clip)
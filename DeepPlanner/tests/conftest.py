@@ -0,0 +1,11 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)        #env/, telemetry_*/ import from DeepPlanner/
+
+@pytest.fixture(autouse=True)
+def in_deepplanner(monkeypatch):        #topologies are loaded from topo/ relative to DeepPlanner/
+    monkeypatch.chdir(ROOT)
@@ -0,0 +1,28 @@
+import pytest
+import torch
+from torch_geometric.nn import GCNConv
+
+from env.network_env import TelemetryEnv
+from env.gcnac import StaticGCNConv
+
+@pytest.mark.parametrize("g", ["topo/Nsfnet.graphml", "topo/Agis.graphml"])
+def test_static_gcn_matches_gcnconv(g):
+    env = TelemetryEnv(g)
+    torch.manual_seed(0)
+    conv = GCNConv(5, 4)
+    static = StaticGCNConv(5, 4)
+    static.load_state_dict(conv.state_dict())
+    x = torch.rand(3, env.nodes_num, 5)
+    assert torch.allclose(conv(x, env.edge_index), static(x, env.edge_index), atol=1e-6)
+
+def test_static_gcn_cache_is_bounded():
+    env = TelemetryEnv()
+    edge_index = env.edge_index
+    conv = StaticGCNConv(5, 4)
+    x = torch.rand(2, env.nodes_num, 5)
+    first = conv(x, edge_index)
+    for _ in range(3*StaticGCNConv.cache_size):     #a new tensor every call, as edge_index.to(device) on CUDA gives
+        assert torch.allclose(conv(x, edge_index.clone()), first)
+    assert len(conv._adj) == StaticGCNConv.cache_size
+    conv(x, edge_index)
+    assert list(conv._adj)[-1] == id(edge_index)    #most recently used last
@@ -0,0 +1,15 @@
+import numpy as np
+
+from env.multi_topo import make_multi_topology_env
+from env.scenario import make_scenarios
+
+GRAPHS = ["topo/Nsfnet.graphml", "topo/Agis.graphml"]
+
+def test_scenario_banks_per_graph():
+    env, train_envs, test_envs = make_multi_topology_env(GRAPHS, 4, 1, scenario_num=3, test_scenario_num=2, scenario_seed=5)
+    test_envs.reset()
+    for req_bits in test_envs.get_env_attr("req_bits"):
+        bank = make_scenarios(len(req_bits), 2, 6, env.telemetry_type)
+        assert np.array_equal(req_bits, bank[0])
+    for i, scenarios in enumerate(train_envs.get_env_attr("scenarios")):
+        assert len(scenarios) == 3 and scenarios.shape[1] == test_envs.get_env_attr("edge_len", i % 2)[0]
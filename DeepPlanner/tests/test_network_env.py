@@ -0,0 +1,53 @@
+from statistics import pvariance
+
+import numpy as np
+import pytest
+
+from env.batched_env import BatchedTelemetryEnv
+from env.network_env import TelemetryEnv
+from env.scenario import make_scenarios
+
+TOPOLOGIES = ["topo/Nsfnet.graphml", "topo/Agis.graphml"]
+
+def random_action(mask, rng):
+    return int(rng.choice(np.flatnonzero(mask)))
+
+@pytest.mark.parametrize("g", TOPOLOGIES)
+def test_welford_probe_variance(g):         #running variance of probe lengths vs a full recomputation
+    env = TelemetryEnv(g)
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        obs, _ = env.reset()
+        done = False
+        while not done:
+            obs, _, done, _ = env.step(random_action(obs["mask"], rng))
+            lens = [len(p) for p in env._laststate["probe"]]
+            assert env._probe_num == len(lens)
+            assert abs(env._len_m2/env._probe_num - pvariance(lens)) < 1e-9
+
+@pytest.mark.parametrize("g", TOPOLOGIES)
+def test_batched_welford_probe_variance(g):
+    env = BatchedTelemetryEnv(8, g)
+    rng = np.random.default_rng(0)
+    obs, _ = env.reset()
+    for _ in range(400):
+        act = [random_action(m, rng) for m in obs["mask"]]
+        obs, _, done, _ = env.step(act)
+        for i in range(env.env_num):
+            lens = [len(p) for p in env.get_probe(i)]
+            assert env._probe_num[i] == len(lens)
+            assert abs(env._len_m2[i]/env._probe_num[i] - pvariance(lens)) < 1e-9
+        if done.any():
+            ids = np.flatnonzero(done)
+            obs_reset, _ = env.reset(ids)
+            obs["mask"][ids] = obs_reset["mask"]
+
+def test_batched_first_reset_loads_the_first_scenarios():      #construction leaves the bank alone
+    env = TelemetryEnv()
+    bank = make_scenarios(env.edge_len, 8, 0)
+    batched = BatchedTelemetryEnv(5, scenarios=bank)
+    assert np.array_equal(batched.req_bits, bank[:5])
+    batched.restart()
+    batched.reset()
+    assert batched._scenario.tolist() == [0, 1, 2, 3, 4]
+    assert np.array_equal(batched.req_bits, bank[:5])
@@ -0,0 +1,41 @@
+import numpy as np
+
+from env.plan_archive import PlanArchive
+
+A = np.array([31, 29, 7])
+B = np.array([19, 24, 31])
+
+def test_plans_are_ranked_per_workload():
+    archive = PlanArchive(k=2)
+    assert archive.add(0.1, [[0, 1]], "g", A)
+    assert archive.add(0.3, [[2, 3]], "g", A)
+    assert not archive.add(0.1, [[0, 1]], "g", A)      #same plan, same workload
+    assert not archive.add(0.0, [[4, 5]], "g", A)      #worse than both kept plans
+    assert archive.add(0.2, [[4, 5]], "g", A)          #replaces the worst
+    assert archive.add(0.05, [[0, 1]], "g", B)         #same ports on another workload is another plan
+    assert len(archive) == 3
+    assert [p["reward"] for p in archive.best(scenario=A)] == [0.3, 0.2]
+    assert [p["reward"] for p in archive.best(scenario=B)] == [0.05]
+    assert archive.best(1, scenario=B)[0]["scenario"] == B.tolist()
+
+def test_elites_follow_the_requested_workloads():
+    archive = PlanArchive(k=3)
+    archive.add(0.9, [[0, 1]], "g", A)                 #a better plan, but of a training workload
+    archive.add(0.2, [[2, 3]], "g", B)
+    archive.add(0.4, [[4, 5]], "g", B)
+    elites = archive.elites([PlanArchive.workload("g", B)], 1)
+    assert len(elites) == 1 and elites[0]["scenario"] == B.tolist()
+    assert [p["reward"] for p in elites[0]["plans"]] == [0.4]
+    assert len(archive.elites()) == 2
+    assert archive.elites([]) == archive.elites()             #no evaluation workloads yet
+
+def test_save_and_load_keep_the_workload(tmp_path):
+    path = str(tmp_path / "elite_plans.json")
+    archive = PlanArchive(k=2, path=path)
+    archive.add(0.1, [[0, 1]], "g", A)
+    archive.add(0.2, [[0, 1]], "g", B)
+    archive.add(0.3, [[2, 3]], "g")
+    archive.save()
+    loaded = PlanArchive(k=2, path=path)
+    assert loaded.best() == archive.best()
+    assert set(loaded.workloads()) == set(archive.workloads())
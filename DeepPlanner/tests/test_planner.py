@@ -0,0 +1,44 @@
+import numpy as np
+import torch
+import torch.nn as nn
+
+from env.network_env import TelemetryEnv
+from env.planner import anytime_plan, beam_search_plan, greedy_plan
+from env.scenario import make_scenarios
+from env.gcnac import GCNCategoricalActor, GCN
+
+def make_actor(env):
+    torch.manual_seed(0)
+    node_num, feature_num = env.observation_space["feat"].shape
+    return GCNCategoricalActor(1, node_num, GCN(feature_num, 1), (16, 16), env.action_space.n, nn.ReLU)
+
+def replay(env, plan):
+    env.restart()
+    reward = 0
+    for a in plan["actions"]:
+        _, rew, done, _ = env.step(int(a))
+        reward += rew
+    return done, reward
+
+def test_plans_keep_the_scenario_of_a_bank_env():
+    env = TelemetryEnv()
+    env.scenarios = make_scenarios(env.edge_len, 4, 0)
+    env.reset()                                 #loads scenario 0
+    req_bits = env.req_bits.copy()
+    actor = make_actor(env)
+    plans = [greedy_plan(actor, env), greedy_plan(actor, env), beam_search_plan(actor, env, 4)]
+    anytime_plan(actor, env, 0.5)
+    assert env._scenario == 0 and np.array_equal(env.req_bits, req_bits)
+    assert plans[0]["actions"].tolist() == plans[1]["actions"].tolist()
+    for plan in plans:
+        done, reward = replay(env, plan)
+        assert done and abs(reward - plan["reward"]) < 1e-9
+
+def test_plan_of_a_given_scenario():
+    env = TelemetryEnv()
+    scenario = make_scenarios(env.edge_len, 1, 1)[0]
+    actor = make_actor(env)
+    plan = beam_search_plan(actor, env, 2, scenario)
+    assert np.array_equal(env.req_bits, scenario)
+    done, reward = replay(env, plan)
+    assert done and abs(reward - plan["reward"]) < 1e-9
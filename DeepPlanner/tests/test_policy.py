@@ -0,0 +1,41 @@
+import torch
+import torch.nn as nn
+from tianshou.data import Batch
+from tianshou.utils.net.common import ActorCritic
+from torch.optim.lr_scheduler import CosineAnnealingLR
+
+from env.network_env import TelemetryEnv
+from env.telemetry_onpolicytrainer import cpu_policy
+from env.gcnac import GCNCategoricalActor, GCNCritic, GCN
+from telemetry_ppo.telemetry_policy_ppo import TelemetryPPO
+
+def make_ppo(**kwargs):
+    env = TelemetryEnv()
+    node_num, feature_num = env.observation_space["feat"].shape
+    gcn = GCN(feature_num, 1)
+    actor = GCNCategoricalActor(1, node_num, gcn, (16, 16), env.action_space.n, nn.ReLU)
+    critic = GCNCritic(1, node_num, gcn, (16, 16), nn.ReLU)
+    optim = torch.optim.AdamW(ActorCritic(actor, critic).parameters())
+    return TelemetryPPO(actor=actor, critic=critic, optim=optim, env=env, device="cpu",
+                        dist_fn=torch.distributions.Categorical, action_space=env.action_space,
+                        action_scaling=False, **kwargs)
+
+def test_ppo_lr_decay_sets_scheduler():
+    policy = make_ppo(lr_decay=True, lr_maxt=7)
+    assert isinstance(policy.lr_scheduler, CosineAnnealingLR)
+    assert policy.lr_scheduler.optimizer is policy.optim
+    assert policy.lr_scheduler.T_max == 7
+
+def test_ppo_without_lr_decay_has_no_scheduler():
+    assert make_ppo().lr_scheduler is None
+
+def test_cpu_policy_copy_for_the_eval_worker():
+    policy = make_ppo()
+    copy = cpu_policy(policy)
+    assert copy is not policy and copy._device == "cpu" and copy.edge_index.device.type == "cpu"
+    assert all(v.device.type == "cpu" for v in copy.state_dict().values())
+    obs, _ = policy.env.reset()
+    batch = Batch(obs=Batch(feat=obs["feat"][None], mask=obs["mask"][None]), info=Batch())
+    assert torch.equal(policy(batch).logits, copy(batch).logits)
+    next(copy.parameters()).data.add_(1)        #weights are not shared
+    assert not torch.equal(policy(batch).logits, copy(batch).logits)
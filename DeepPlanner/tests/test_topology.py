@@ -0,0 +1,23 @@
+import os
+
+import numpy as np
+
+from env import topology
+
+G = "topo/Nsfnet.graphml"
+
+def test_cache_goes_to_the_user_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(topology, "_loaded", {})
+    topo = topology.load_topology(G)
+    files = os.listdir(tmp_path / "deep-int" / "topo")
+    assert len(files) == 1 and files[0].startswith("Nsfnet-") and files[0].endswith(".npz")
+    with np.load(tmp_path / "deep-int" / "topo" / files[0]) as f:
+        assert np.array_equal(f["port_peer"], topo["port_peer"])
+
+def test_unwritable_cache_still_compiles(tmp_path, monkeypatch):
+    blocker = tmp_path / "file"
+    blocker.write_text("")                  #a file where the cache directory should be
+    monkeypatch.setattr(topology, "_loaded", {})
+    topo = topology.load_topology(G, cache_dir=str(blocker / "topo"))
+    assert np.array_equal(topo["edge_index"], topology.compile_topology(G)["edge_index"])